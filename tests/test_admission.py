@@ -0,0 +1,122 @@
+"""Tests for webapp/admission.py"""
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from webapp.admission import AdmissionController, RouteLimiter, default_controller
+
+
+def _acquire_in_thread(limiter):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('reason', limiter.acquire()))
+    thread.start()
+    return thread, result
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'condition not reached'
+        time.sleep(0.005)
+
+
+def test_admits_up_to_limit():
+    limiter = RouteLimiter('predict', limit=2, queue_size=0, wait_timeout=1)
+    assert limiter.acquire() is None
+    assert limiter.acquire() is None
+    assert limiter.acquire() == 'queue_full'
+    assert limiter.stats()['in_flight'] == 2
+
+
+def test_queues_up_to_queue_size():
+    limiter = RouteLimiter('predict', limit=1, queue_size=2, wait_timeout=5)
+    assert limiter.acquire() is None
+    waiters = [_acquire_in_thread(limiter) for _ in range(2)]
+    _wait_for(lambda: limiter.waiting == 2)
+    assert limiter.acquire() == 'queue_full'
+    assert limiter.rejected_queue_full == 1
+
+    limiter.release()
+    limiter.release()
+    for thread, result in waiters:
+        thread.join(2)
+        assert result['reason'] is None
+    assert limiter.stats()['admitted'] == 3
+
+
+def test_release_wakes_queued_waiter():
+    limiter = RouteLimiter('render', limit=1, queue_size=1, wait_timeout=5)
+    assert limiter.acquire() is None
+    thread, result = _acquire_in_thread(limiter)
+    _wait_for(lambda: limiter.waiting == 1)
+    limiter.release()
+    thread.join(2)
+    assert not thread.is_alive()
+    assert result['reason'] is None
+    assert limiter.in_flight == 1 and limiter.waiting == 0
+
+
+def test_times_out_after_wait_timeout():
+    limiter = RouteLimiter('render', limit=1, queue_size=1, wait_timeout=0.05)
+    assert limiter.acquire() is None
+    start = time.monotonic()
+    assert limiter.acquire() == 'timeout'
+    assert time.monotonic() - start >= 0.05
+    assert limiter.rejected_timeout == 1 and limiter.waiting == 0
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    controller = AdmissionController({
+        'full': (0, 0, 1, ['full']),
+        'slow': (0, 1, 0.05, ['slow']),
+        'open': (1, 0, 1, ['open']),
+    }, retry_after=7)
+    controller.init_app(app)
+    for name in ('full', 'slow', 'open', 'health'):
+        app.add_url_rule(f'/{name}', name, lambda: 'ok')
+    app.controller = controller
+    return app
+
+
+@pytest.mark.parametrize('path, reason', [('/full', 'queue_full'), ('/slow', 'timeout')])
+def test_sheds_with_503_and_retry_after(app, path, reason):
+    response = app.test_client().get(path)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '7'
+    assert response.get_json()['reason'] == reason
+
+
+def test_releases_after_request(app):
+    client = app.test_client()
+    assert client.get('/open').status_code == 200
+    assert client.get('/open').status_code == 200
+    assert client.get('/health').status_code == 200
+    assert app.controller.limiters['open'].in_flight == 0
+
+
+def test_check_thread_budget():
+    routes = {'predict': (2, 1, 1, []), 'render': (1, 1, 1, [])}
+    controller = AdmissionController(routes, threads=8, reserved_threads=2)
+    assert controller.threads_held() == 5
+    controller.hold_threads('stream', 1)
+    with pytest.raises(ValueError):
+        controller.hold_threads('stream', 2)
+    with pytest.raises(ValueError):
+        AdmissionController(routes, threads=6, reserved_threads=2)
+    # No thread count configured: nothing to check
+    AdmissionController({'predict': (50, 50, 1, [])})
+
+
+def test_default_controller_reads_env(monkeypatch):
+    monkeypatch.setenv('GUNICORN_THREADS', '8')
+    monkeypatch.setenv('ADMISSION_RESERVED_THREADS', '2')
+    assert default_controller().threads_held() == 5
+    monkeypatch.setenv('ADMISSION_QUEUE_SIZE', '4')
+    with pytest.raises(ValueError):
+        default_controller()
+    monkeypatch.setenv('GUNICORN_THREADS', '16')
+    assert default_controller().threads_held() == 11
@@ -0,0 +1,62 @@
+"""Tests for webapp/drift.py"""
+import numpy as np
+import pytest
+from sklearn.preprocessing import MinMaxScaler
+
+from training.dataset import feature_stats
+from webapp.drift import DriftMonitor
+
+FEATURES = [f'f{j}' for j in range(8)]
+
+
+@pytest.fixture
+def training():
+    rng = np.random.default_rng(0)
+    X_train = np.column_stack([rng.normal(100 * (j + 1), 10, 3000) for j in range(len(FEATURES))])
+    scaler_X = MinMaxScaler().fit(X_train)
+    return X_train, scaler_X, feature_stats(X_train, scaler_X.transform(X_train), FEATURES)
+
+
+def _monitor(training, min_observations=100):
+    _, scaler_X, stats = training
+    monitor = DriftMonitor(min_observations=min_observations)
+    monitor.configure(FEATURES, scaler_X, stats, model_version='v1')
+    return monitor
+
+
+@pytest.mark.parametrize('n', [1, 10, 99])
+def test_few_observations_are_insufficient(training, n):
+    monitor = _monitor(training)
+    for row in training[0][:n]:
+        monitor.observe(row)
+    stats = monitor.stats()
+    assert stats['drifted_features'] == 0
+    assert 'max_psi' not in stats
+    assert all(f['status'] == 'insufficient_data' and 'psi' not in f for f in stats['features'])
+
+
+def test_in_distribution_samples_stay_stable(training):
+    monitor = _monitor(training)
+    rng = np.random.default_rng(1)
+    for row in training[0][rng.choice(len(training[0]), 500, replace=False)]:
+        monitor.observe(row)
+    stats = monitor.stats()
+    assert stats['drifted_features'] == 0
+    assert all(f['status'] == 'stable' for f in stats['features'])
+    assert stats['max_psi'] < 0.1
+
+
+def test_shifted_samples_drift(training):
+    monitor = _monitor(training)
+    for row in training[0][:200]:
+        monitor.observe(row * 1.3)
+    stats = monitor.stats()
+    assert stats['drifted_features'] == len(FEATURES)
+    assert stats['max_psi'] >= 0.25
+
+
+def test_record_prediction_rate(training):
+    monitor = _monitor(training)
+    for source in ('model', 'model', 'model', 'baseline:unreasonable'):
+        monitor.record_prediction(source)
+    assert monitor.stats()['baseline_fallback_rate'] == 0.25
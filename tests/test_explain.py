@@ -0,0 +1,91 @@
+"""Tests for webapp/explain.py"""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import MinMaxScaler
+
+from webapp import explain
+from webapp.explain import Explainer, _path_contributions, explain_matrix
+
+
+@pytest.fixture
+def forest():
+    rng = np.random.default_rng(0)
+    X = rng.random((300, 6)) * 100
+    y = X[:, 0] * 3 + X[:, 1] + rng.random(300)
+    scaler_X = MinMaxScaler().fit(X)
+    scaler_y = MinMaxScaler().fit(y.reshape(-1, 1))
+    model = RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0).fit(
+        scaler_X.transform(X), scaler_y.transform(y.reshape(-1, 1)).ravel())
+
+    def predict_fn(X_raw):
+        scaled = model.predict(scaler_X.transform(X_raw)).reshape(-1, 1)
+        return scaler_y.inverse_transform(scaled).ravel()
+
+    return X, model, scaler_X, scaler_y, predict_fn
+
+
+def test_path_contributions_add_up(forest):
+    X, model, scaler_X, _, _ = forest
+    X_scaled = scaler_X.transform(X[:50])
+    contributions, bias, method = _path_contributions(model, X_scaled)
+    assert method == 'tree_path'
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), model.predict(X_scaled), atol=1e-9)
+
+
+def test_forest_explanations_are_exact(forest):
+    X, model, scaler_X, scaler_y, predict_fn = forest
+    contributions, bias, outputs, method = explain_matrix(X[:20], model, scaler_X, scaler_y, predict_fn)
+    assert method in ('treeshap', 'tree_path')
+    np.testing.assert_allclose(outputs, predict_fn(X[:20]), rtol=1e-6)
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), outputs, rtol=1e-6)
+
+
+def test_occlusion_reports_model_output(forest):
+    X, _, scaler_X, _, predict_fn = forest
+    _, _, outputs, method = explain_matrix(X[:20], scaler_X=scaler_X, predict_fn=predict_fn)
+    assert method == 'occlusion'
+    np.testing.assert_allclose(outputs, predict_fn(X[:20]))
+
+
+def _wait_ready(history):
+    deadline = time.monotonic() + 10
+    while history['status'] == 'computing':
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return history
+
+
+def test_history_rebuilds_on_new_data_and_after_failure(forest, tmp_path, monkeypatch):
+    X, model, scaler_X, scaler_y, predict_fn = forest
+    names = [f'f{j}' for j in range(X.shape[1])]
+    path = str(tmp_path / 'data.csv')
+    df = pd.DataFrame(X, columns=names)
+    df['Date'] = pd.date_range('2024-01-01', periods=len(df)).strftime('%Y-%m-%d')
+    df.iloc[:-1].to_csv(path, index=False)
+
+    explainer = Explainer()
+    kwargs = dict(model=model, scaler_X=scaler_X, scaler_y=scaler_y, predict_fn=predict_fn)
+    history = _wait_ready(explainer.start_history('v1', path, names, 1000, **kwargs))
+    new_day = df['Date'].iloc[-1]
+    assert explainer.history_entry(history, new_day, names) is None
+    assert explainer.start_history('v1', path, names, 1000, **kwargs) is history
+
+    # update_data.py appends a day: same model version, new history
+    df.to_csv(path, index=False)
+    os.utime(path, (time.time() + 5, time.time() + 5))
+    history = _wait_ready(explainer.start_history('v1', path, names, 1000, **kwargs))
+    assert explainer.history_entry(history, new_day, names)['as_of'] == new_day
+
+    # A failed history is retried once HISTORY_RETRY_SECONDS have passed
+    failing = dict(kwargs, scaler_X=None, model=None)
+    failed = _wait_ready(explainer.start_history('v2', path, names, 1000, **failing))
+    assert failed['status'] == 'failed'
+    assert explainer.start_history('v2', path, names, 1000, **kwargs) is failed
+    monkeypatch.setattr(explain, 'HISTORY_RETRY_SECONDS', 0)
+    retried = _wait_ready(explainer.start_history('v2', path, names, 1000, **kwargs))
+    assert retried is not failed and retried['status'] == 'ready'
@@ -0,0 +1,73 @@
+"""Tests for training/refresh.py"""
+import importlib.util
+
+import numpy as np
+import pytest
+
+from training.refresh import _refresh_random_forest, refit_scaler_y, remap_target
+
+A, B = 0.8, 0.15  # a shrunk and shifted target range, as refit_scaler_y produces
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.random((200, 5))
+    y = X @ np.array([0.5, 0.2, 0.1, 0.1, 0.1]) + 0.05 * rng.random(200)
+    return X, y
+
+
+def _fit(name, X, y):
+    if name == 'random_forest':
+        from sklearn.ensemble import RandomForestRegressor
+        return RandomForestRegressor(n_estimators=10, max_depth=4, random_state=0, n_jobs=1).fit(X, y)
+    if name == 'xgboost':
+        import xgboost as xgb
+        return xgb.XGBRegressor(n_estimators=20, max_depth=3, random_state=0, n_jobs=1).fit(X, y)
+    if name == 'lightgbm':
+        import lightgbm as lgb
+        return lgb.LGBMRegressor(n_estimators=20, num_leaves=7, random_state=0, n_jobs=1, verbose=-1).fit(X, y)
+    raise ValueError(name)
+
+
+@pytest.mark.parametrize('name', ['random_forest', 'xgboost', 'lightgbm'])
+def test_remap_target_tree_models(name, data):
+    pytest.importorskip({'random_forest': 'sklearn'}.get(name, name))
+    X, y = data
+    model = _fit(name, X, y)
+    before = model.predict(X)
+    remap_target(model, name, A, B)
+    np.testing.assert_allclose(model.predict(X), A * before + B, rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize('name', ['lstm', 'gru'])
+def test_remap_target_keras(name, data):
+    if importlib.util.find_spec('tensorflow') is None:
+        pytest.skip('TensorFlow not installed')
+    from tensorflow import keras
+    X, _ = data
+    layer = keras.layers.LSTM if name == 'lstm' else keras.layers.GRU
+    model = keras.Sequential([keras.Input((3, X.shape[1])), layer(4), keras.layers.Dense(1)])
+    X_seq = X[:60].reshape(20, 3, X.shape[1])
+    before = model.predict(X_seq, verbose=0).ravel()
+    remap_target(model, name, A, B)
+    np.testing.assert_allclose(model.predict(X_seq, verbose=0).ravel(), A * before + B, rtol=1e-5, atol=1e-6)
+
+
+def test_refit_scaler_y_matches_remap(data):
+    from sklearn.preprocessing import MinMaxScaler
+    _, y = data
+    scaler = MinMaxScaler().fit(y[:150].reshape(-1, 1))
+    old_scaled = scaler.transform(y.reshape(-1, 1)).ravel()
+    a, b = refit_scaler_y(scaler, y[150:] * 1.5)
+    np.testing.assert_allclose(scaler.transform(y.reshape(-1, 1)).ravel(), a * old_scaled + b)
+    assert refit_scaler_y(scaler, y[:10]) is None
+
+
+def test_refresh_random_forest_restores_params(data):
+    X, y = data
+    model = _fit('random_forest', X, y)
+    model = _refresh_random_forest(model, X[-50:], y[-50:], add_trees=5, max_trees=12)
+    assert len(model.estimators_) == 12
+    assert model.n_jobs == 1
+    assert model.warm_start is False
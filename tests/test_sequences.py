@@ -0,0 +1,45 @@
+"""Tests for training/sequences.py"""
+import numpy as np
+import pytest
+
+from training.sequences import SEQUENCE_DTYPE, create_sequences
+
+
+def naive_sequences(X, y, sequence_length):
+    """List-based builder from Train_Local.ipynb"""
+    X_seq, y_seq = [], []
+    for i in range(len(X) - sequence_length):
+        X_seq.append(X[i:i + sequence_length])
+        y_seq.append(y[i + sequence_length])
+    return np.array(X_seq), np.array(y_seq)
+
+
+@pytest.mark.parametrize('n, sequence_length', [(100, 30), (31, 30), (10, 1)])
+def test_create_sequences_matches_naive(n, sequence_length):
+    rng = np.random.default_rng(0)
+    X = rng.random((n, 4)).astype(SEQUENCE_DTYPE)
+    y = rng.random(n).astype(SEQUENCE_DTYPE)
+    X_seq, y_seq = create_sequences(X, y, sequence_length)
+    X_ref, y_ref = naive_sequences(X, y, sequence_length)
+    assert X_seq.shape == X_ref.shape == (n - sequence_length, sequence_length, 4)
+    np.testing.assert_array_equal(X_seq, X_ref)
+    np.testing.assert_array_equal(y_seq, y_ref)
+
+
+@pytest.mark.parametrize('n', [30, 5, 0])
+def test_create_sequences_too_short(n):
+    X = np.zeros((n, 4), dtype=SEQUENCE_DTYPE)
+    X_seq, y_seq = create_sequences(X, np.zeros(n), 30)
+    assert X_seq.shape == (0, 30, 4)
+    assert y_seq.shape == (0,)
+
+
+def test_create_sequences_are_read_only_views():
+    X = np.arange(200, dtype=SEQUENCE_DTYPE).reshape(50, 4)
+    y = np.arange(50, dtype=SEQUENCE_DTYPE)
+    X_seq, y_seq = create_sequences(X, y, 10)
+    assert np.shares_memory(X_seq, X)
+    assert np.shares_memory(y_seq, y)
+    assert not X_seq.flags.writeable
+    with pytest.raises(ValueError):
+        X_seq[0, 0, 0] = 1.0
@@ -0,0 +1,80 @@
+"""Tests for webapp/stream.py"""
+import threading
+
+import pytest
+
+from webapp.stream import StreamFull, UpdateBroadcaster
+
+
+def _next_event(subscription):
+    for item in subscription.events():
+        if item is not None:
+            return item
+
+
+def _producer(prices, max_clients=4):
+    feed = iter(prices)
+    b = UpdateBroadcaster(fetch_fn=lambda: {'Gold_Close': next(feed)},
+                          compute_fn=lambda features: {'price': features['Gold_Close']},
+                          version_fn=lambda: 'v1', max_clients=max_clients, heartbeat=0.01)
+    b._ensure_producer = lambda: None  # the tests call refresh() themselves
+    return b
+
+
+def test_one_computation_fans_out_to_every_client():
+    b = _producer([1.0, 1.0, 2.0])
+    subscriptions = [b.subscribe() for _ in range(3)]
+    assert b.refresh() and not b.refresh() and b.refresh()
+    assert b.recomputes == 2
+    for s in subscriptions:
+        assert _next_event(s) == (1, 'update', {'price': 1.0})
+        assert _next_event(s) == (2, 'update', {'price': 2.0})
+
+
+def test_cap_and_release():
+    b = _producer([], max_clients=1)
+    first = b.subscribe()
+    with pytest.raises(StreamFull):
+        b.subscribe()
+    first.close()
+    first.close()
+    assert b.stats()['clients'] == 0
+    b.subscribe().close()
+
+
+def test_slow_client_skips_to_latest():
+    b = _producer([])
+    b._events = type(b._events)(maxlen=2)
+    s = b.subscribe()
+    for i in range(5):
+        b.publish('update', {'i': i})
+    assert _next_event(s) == (5, 'update', {'i': 4})
+    assert b.skipped_events == 1
+
+
+def test_relay_keeps_hub_ids_and_follows_a_restarted_hub():
+    requested = []
+    hub_events = [[(7, 'update', {'n': 7}), None, (8, 'update', {'n': 8})],
+                  [(1, 'update', {'n': 1})]]  # the hub restarted
+
+    def feed(last_event_id):
+        requested.append(last_event_id)
+        yield from (hub_events.pop(0) if hub_events else [])
+        threading.Event().wait(0.05)
+
+    b = UpdateBroadcaster(feed=feed, heartbeat=0.01, retry=0.01)
+    s = b.subscribe()
+    assert _next_event(s) == (7, 'update', {'n': 7})
+    assert _next_event(s) == (8, 'update', {'n': 8})
+    assert _next_event(s) == (1, 'update', {'n': 1})
+    s.close()
+    assert requested[:2] == [None, 8]
+    assert b.stats()['source'] == 'relay' and b.relayed == 3
+
+
+def test_resume_from_last_event_id():
+    b = _producer([])
+    for i in range(3):
+        b.publish('update', {'i': i})
+    assert _next_event(b.subscribe(last_event_id=1)) == (2, 'update', {'i': 1})
+    assert _next_event(b.subscribe()) == (3, 'update', {'i': 2})
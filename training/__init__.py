@@ -0,0 +1,4 @@
+"""
+Gold Price Model Training
+Scripted replacement for the Train_Local.ipynb workflow
+"""
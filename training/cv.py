@@ -0,0 +1,104 @@
+"""
+Walk-Forward Cross-Validation
+Time-ordered folds with per-fold scaled arrays memoized in the training cache
+"""
+import os
+
+import numpy as np
+
+from .dataset import (
+    DEFAULT_CACHE_DIR, SEQUENCE_LENGTH, TARGET_COL,
+    cache_key, clean_dataset, count_rows, file_digest, is_cached, load_dataset, scale_split, write_cache
+)
+from .sequences import SEQUENCE_DTYPE
+
+SCHEMES = ('expanding', 'sliding')
+
+
+def walk_forward_splits(n_samples, n_folds=5, scheme='expanding', test_size=None,
+                        train_size=None, min_train_size=None):
+    """Return [(train_start, train_end, test_start, test_end), ...] in time order
+
+    Test blocks are consecutive and cover the tail of the series. With the
+    'expanding' scheme every fold trains on all data before its test block;
+    with 'sliding' the training window has a fixed length (train_size).
+    """
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown CV scheme: {scheme}")
+    test_size = test_size or n_samples // (n_folds + 1)
+    first_test_start = n_samples - n_folds * test_size
+    min_train_size = min_train_size or test_size
+    if test_size <= 0 or first_test_start < min_train_size:
+        raise ValueError(f"Not enough samples ({n_samples}) for {n_folds} folds")
+
+    train_size = train_size or first_test_start
+    splits = []
+    for k in range(n_folds):
+        test_start = first_test_start + k * test_size
+        train_start = 0 if scheme == 'expanding' else max(0, test_start - train_size)
+        splits.append((train_start, test_start, test_start, test_start + test_size))
+    return splits
+
+
+def prepare_cv_folds(data_path, cache_dir=DEFAULT_CACHE_DIR, n_folds=5, scheme='expanding',
+                     sequence_length=SEQUENCE_LENGTH, train_size=None, digest=None):
+    """Build (or reuse) one cache directory per fold and return their paths
+
+    Each fold's scalers are fit on that fold's training window only. Folds are
+    keyed by data digest and fold bounds, so adding folds or re-running with
+    the same data only prepares what is missing.
+    """
+    digest = digest or file_digest(data_path)
+    df_clean = None
+    fold_paths = []
+    n_samples = count_rows(data_path)
+    splits = walk_forward_splits(n_samples, n_folds, scheme, train_size=train_size,
+                                 min_train_size=sequence_length + 1)
+
+    for k, (train_start, train_end, test_start, test_end) in enumerate(splits):
+        bounds = [train_start, train_end, test_start, test_end]
+        key = cache_key(digest, bounds, sequence_length, np.dtype(SEQUENCE_DTYPE).name)
+        fold_path = os.path.join(cache_dir, 'folds', key)
+        fold_paths.append(fold_path)
+        if is_cached(fold_path):
+            continue
+
+        if df_clean is None:
+            df_clean = clean_dataset(load_dataset(data_path))
+            y = df_clean[TARGET_COL].values
+            X = df_clean.drop(columns=[TARGET_COL]).values
+            feature_names = df_clean.drop(columns=[TARGET_COL]).columns.tolist()
+
+        arrays, scaler_X, scaler_y = scale_split(
+            X, y, slice(train_start, train_end), slice(test_start, test_end))
+        info = {
+            'fold': k,
+            'scheme': scheme,
+            'bounds': bounds,
+            'feature_names': feature_names,
+            'sequence_length': sequence_length,
+            'cache_key': key,
+        }
+        write_cache(fold_path, arrays, scaler_X, scaler_y, info)
+
+    status = 'all cached' if df_clean is None else 'prepared'
+    print(f"✅ CV folds ready: {len(fold_paths)} {scheme} folds ({status})")
+    return fold_paths
+
+
+def summarize(fold_metrics):
+    """Mean/std/min/max per metric over folds: {model: {'r2_mean': ..., ...}}"""
+    summary = {}
+    for name, folds in fold_metrics.items():
+        folds = [m for m in folds if m is not None]
+        if not folds:
+            continue
+        stats = {'n_folds': len(folds)}
+        for metric in ('r2', 'mae', 'rmse', 'mape'):
+            values = np.array([m[metric] for m in folds], dtype=np.float64)
+            stats[f'{metric}_mean'] = float(values.mean())
+            stats[f'{metric}_std'] = float(values.std(ddof=1)) if len(values) > 1 else 0.0
+            stats[f'{metric}_min'] = float(values.min())
+            stats[f'{metric}_max'] = float(values.max())
+        summary[name] = stats
+    return summary
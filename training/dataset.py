@@ -0,0 +1,197 @@
+"""
+Training Data Preparation
+Cleaning, chronological splitting, scaling and the on-disk array cache
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from .sequences import SEQUENCE_DTYPE, create_sequences
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Written by update_data.py; falls back to the notebook-era CSV
+ENHANCED_PARQUET_PATH = os.path.join(PROJECT_DIR, 'data', 'enhanced_gold_data_complete.parquet')
+ENHANCED_CSV_PATH = os.path.join(PROJECT_DIR, 'enhanced_gold_data_complete.csv')
+DEFAULT_DATA_PATH = ENHANCED_PARQUET_PATH if os.path.exists(ENHANCED_PARQUET_PATH) else ENHANCED_CSV_PATH
+DEFAULT_CACHE_DIR = os.path.join(PROJECT_DIR, '.cache', 'training')
+
+TARGET_COL = 'Gold_Close'
+SEQUENCE_LENGTH = 30
+TEST_SIZE = 0.2
+# Histogram bins over the scaled [0, 1] range for the webapp drift monitor
+DRIFT_BINS = 10
+
+# Arrays written to the preparation cache, one .npy file each. Sequence
+# windows are not cached - they are zero-copy views rebuilt on load.
+CACHED_ARRAYS = ['X_train_scaled', 'X_test_scaled', 'y_train_scaled', 'y_test_scaled']
+
+
+def load_dataset(path):
+    """Load the enhanced gold dataset (Parquet from update_data.py, or CSV)"""
+    df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+    print(f"✅ Data loaded: {df.shape[0]:,} rows x {df.shape[1]} columns")
+    return df
+
+
+def count_rows(path):
+    """Number of rows without loading the whole dataset"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    return len(pd.read_csv(path, usecols=[0]))
+
+
+def clean_dataset(df):
+    """Drop date columns and fill gaps like Train_Local.ipynb"""
+    drop_cols = [c for c in ('Date', 'Datetime') if c in df.columns]
+    return df.drop(columns=drop_cols).ffill().bfill().fillna(0)
+
+
+def scale_split(X, y, train, test):
+    """Fit MinMax scalers on the train slice only and transform both slices"""
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler_X = MinMaxScaler()
+    scaler_y = MinMaxScaler()
+    arrays = {
+        'X_train_scaled': scaler_X.fit_transform(X[train]).astype(SEQUENCE_DTYPE),
+        'X_test_scaled': scaler_X.transform(X[test]).astype(SEQUENCE_DTYPE),
+        'y_train_scaled': scaler_y.fit_transform(y[train].reshape(-1, 1)).flatten().astype(SEQUENCE_DTYPE),
+        'y_test_scaled': scaler_y.transform(y[test].reshape(-1, 1)).flatten().astype(SEQUENCE_DTYPE),
+    }
+    return arrays, scaler_X, scaler_y
+
+
+def scaled_bin_index(X_scaled, bins=DRIFT_BINS):
+    """Histogram bin per value: 0 = below training range, 1..bins, bins + 1 = above"""
+    idx = np.clip(np.floor(X_scaled * bins), 0, bins - 1) + 1
+    idx = np.where(X_scaled < 0, 0, np.where(X_scaled > 1, bins + 1, idx))
+    return idx.astype(np.intp)
+
+
+def feature_stats(X_train, X_train_scaled, feature_names, bins=DRIFT_BINS):
+    """Per-feature training distribution (moments + binned proportions) for drift checks"""
+    X_train = np.asarray(X_train, dtype=np.float64)
+    idx = scaled_bin_index(np.asarray(X_train_scaled, dtype=np.float64), bins)
+    stats = {}
+    for j, name in enumerate(feature_names):
+        counts = np.bincount(idx[:, j], minlength=bins + 2)
+        stats[name] = {
+            'mean': float(X_train[:, j].mean()),
+            'std': float(X_train[:, j].std()),
+            'min': float(X_train[:, j].min()),
+            'max': float(X_train[:, j].max()),
+            'hist': (counts / counts.sum()).round(6).tolist(),
+        }
+    return {'bins': bins, 'features': stats}
+
+
+def prepare_arrays(df, test_size=TEST_SIZE, sequence_length=SEQUENCE_LENGTH):
+    """Split and scale the dataset exactly like Train_Local.ipynb"""
+    df_clean = clean_dataset(df)
+    y = df_clean[TARGET_COL].values
+    X = df_clean.drop(columns=[TARGET_COL]).values
+    feature_names = df_clean.drop(columns=[TARGET_COL]).columns.tolist()
+
+    # Chronological split - same sizes as train_test_split(shuffle=False)
+    n_test = int(np.ceil(len(X) * test_size))
+    n_train = len(X) - n_test
+    arrays, scaler_X, scaler_y = scale_split(X, y, slice(0, n_train), slice(n_train, len(X)))
+
+    correlations = df_clean.corr()[TARGET_COL].drop(TARGET_COL).dropna()
+    top = correlations.reindex(correlations.abs().sort_values(ascending=False).index).head(10)
+
+    info = {
+        'feature_names': feature_names,
+        'sequence_length': sequence_length,
+        'test_size': test_size,
+        'data_shape': {'train': [n_train, len(feature_names)], 'test': [n_test, len(feature_names)]},
+        'data_rows': len(df),
+        'data_end': str(df['Date'].iloc[-1]) if 'Date' in df.columns else None,
+        'top_correlations': {k: round(float(v), 6) for k, v in top.items()},
+        'feature_stats': feature_stats(X[:n_train], arrays['X_train_scaled'], feature_names),
+    }
+    return arrays, scaler_X, scaler_y, info
+
+
+def file_digest(path):
+    """Content hash of the dataset, used in cache keys"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(*parts):
+    """Short stable key from a data digest and JSON-serializable parameters"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def write_cache(cache_path, arrays, scaler_X, scaler_y, info):
+    """Write arrays, scalers and info.json to cache_path atomically"""
+    # Build in a temp dir and rename so concurrent runs never see partial caches
+    tmp_path = f"{cache_path}.tmp-{os.getpid()}"
+    os.makedirs(tmp_path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), array)
+    joblib.dump(scaler_X, os.path.join(tmp_path, 'scaler_X.pkl'))
+    joblib.dump(scaler_y, os.path.join(tmp_path, 'scaler_y.pkl'))
+    with open(os.path.join(tmp_path, 'info.json'), 'w') as f:
+        json.dump(info, f, indent=2)
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    try:
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # Another run finished first - keep theirs
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def is_cached(cache_path):
+    return os.path.exists(os.path.join(cache_path, 'info.json'))
+
+
+def prepare_cached(data_path, cache_dir=DEFAULT_CACHE_DIR, test_size=TEST_SIZE,
+                   sequence_length=SEQUENCE_LENGTH, digest=None):
+    """Return a cache directory holding the prepared arrays, building it if needed"""
+    params = {'test_size': test_size, 'sequence_length': sequence_length}
+    key = cache_key(digest or file_digest(data_path), params, np.dtype(SEQUENCE_DTYPE).name)
+    cache_path = os.path.join(cache_dir, key)
+
+    if is_cached(cache_path):
+        print(f"♻️  Using cached arrays: {cache_path}")
+        return cache_path
+
+    print(f"🔧 Preparing arrays (cache miss: {key})...")
+    arrays, scaler_X, scaler_y, info = prepare_arrays(load_dataset(data_path), **params)
+    info['cache_key'] = key
+    write_cache(cache_path, arrays, scaler_X, scaler_y, info)
+    print(f"✅ Cached arrays: {cache_path}")
+    return cache_path
+
+
+def load_cache_info(cache_path):
+    with open(os.path.join(cache_path, 'info.json')) as f:
+        return json.load(f)
+
+
+def load_cached(cache_path, names=CACHED_ARRAYS):
+    """Memory-map the cached arrays and attach sequence window views
+
+    Everything returned is read-only and backed by the page cache, so
+    concurrent workers share one physical copy of the data.
+    """
+    arrays = {name: np.load(os.path.join(cache_path, f'{name}.npy'), mmap_mode='r') for name in names}
+    sequence_length = load_cache_info(cache_path)['sequence_length']
+    for split in ('train', 'test'):
+        if f'X_{split}_scaled' in arrays and f'y_{split}_scaled' in arrays:
+            arrays[f'X_{split}_seq'], arrays[f'y_{split}_seq'] = create_sequences(
+                arrays[f'X_{split}_scaled'], arrays[f'y_{split}_scaled'], sequence_length)
+    return arrays
@@ -0,0 +1,444 @@
+"""
+Gold Price Model Training Pipeline
+Trains every candidate model concurrently and writes the artifacts load_models() expects
+
+Usage:
+    python -m training.pipeline                        # all models, all cores
+    python -m training.pipeline --models xgboost gru   # subset
+    python -m training.pipeline --jobs 8 --output webapp/models
+    python -m training.pipeline --cv-folds 8 --cv-scheme sliding
+"""
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from .cv import SCHEMES, prepare_cv_folds, summarize
+from .dataset import (
+    DEFAULT_CACHE_DIR, DEFAULT_DATA_PATH, PROJECT_DIR,
+    file_digest, load_cache_info, load_cached, prepare_cached
+)
+from .sequences import WindowBatches, to_keras_sequence, train_val_batches
+
+DEFAULT_MODELS_DIR = os.path.join(PROJECT_DIR, 'webapp', 'models')
+RANDOM_STATE = 42
+CV_FOLDS = 5
+
+# metrics key -> (display name, artifact file, is_keras)
+MODEL_SPECS = {
+    'random_forest': ('Random Forest', 'rf_model.pkl', False),
+    'xgboost': ('XGBoost', 'xgb_model.pkl', False),
+    'lightgbm': ('LightGBM', 'lgb_model.pkl', False),
+    'lstm': ('LSTM (Long Short-Term Memory)', 'lstm_model.h5', True),
+    'gru': ('GRU (Gated Recurrent Unit)', 'gru_model.h5', True),
+}
+
+
+# ---------------------------------------------------------------------------
+# Model trainers (run inside worker processes)
+# ---------------------------------------------------------------------------
+
+def _fit_random_forest(arrays, n_jobs):
+    from sklearn.ensemble import RandomForestRegressor
+    model = RandomForestRegressor(
+        n_estimators=200,
+        max_depth=20,
+        min_samples_split=5,
+        min_samples_leaf=2,
+        random_state=RANDOM_STATE,
+        n_jobs=n_jobs
+    )
+    model.fit(arrays['X_train_scaled'], arrays['y_train_scaled'])
+    return model
+
+
+def _fit_xgboost(arrays, n_jobs):
+    import xgboost as xgb
+    model = xgb.XGBRegressor(
+        n_estimators=200,
+        max_depth=8,
+        learning_rate=0.05,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        random_state=RANDOM_STATE,
+        n_jobs=n_jobs
+    )
+    model.fit(arrays['X_train_scaled'], arrays['y_train_scaled'])
+    return model
+
+
+def _fit_lightgbm(arrays, n_jobs):
+    import lightgbm as lgb
+    model = lgb.LGBMRegressor(
+        n_estimators=200,
+        max_depth=8,
+        learning_rate=0.05,
+        num_leaves=31,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        random_state=RANDOM_STATE,
+        n_jobs=n_jobs,
+        verbose=-1
+    )
+    model.fit(arrays['X_train_scaled'], arrays['y_train_scaled'])
+    return model
+
+
+def _fit_recurrent(arrays, n_jobs, cell):
+    import tensorflow as tf
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, GRU, Dense, Dropout
+    from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+
+    tf.config.threading.set_intra_op_parallelism_threads(n_jobs)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    tf.keras.utils.set_random_seed(RANDOM_STATE)
+
+    layer = LSTM if cell == 'lstm' else GRU
+    X_train_seq = arrays['X_train_seq']
+    model = Sequential([
+        layer(64, activation='relu', return_sequences=True,
+              input_shape=(X_train_seq.shape[1], X_train_seq.shape[2])),
+        Dropout(0.2),
+        layer(32, activation='relu'),
+        Dropout(0.2),
+        Dense(16, activation='relu'),
+        Dense(1)
+    ])
+    model.compile(optimizer='adam', loss='mse', metrics=['mae'])
+
+    # Windows are views over the scaled matrix; only one batch is materialized at a time
+    train_batches, val_batches = train_val_batches(
+        X_train_seq, arrays['y_train_seq'], batch_size=32, validation_split=0.2, seed=RANDOM_STATE)
+    model.fit(
+        to_keras_sequence(train_batches),
+        validation_data=to_keras_sequence(val_batches),
+        epochs=100,
+        callbacks=[
+            EarlyStopping(monitor='val_loss', patience=15, restore_best_weights=True),
+            ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, min_lr=1e-6),
+        ],
+        verbose=0
+    )
+    return model
+
+
+TRAINERS = {
+    'random_forest': _fit_random_forest,
+    'xgboost': _fit_xgboost,
+    'lightgbm': _fit_lightgbm,
+    'lstm': lambda arrays, n_jobs: _fit_recurrent(arrays, n_jobs, 'lstm'),
+    'gru': lambda arrays, n_jobs: _fit_recurrent(arrays, n_jobs, 'gru'),
+}
+
+
+def _init_worker(n_threads):
+    """Pin native thread pools of a worker to its CPU budget"""
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ[var] = str(n_threads)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(n_threads)
+    except ImportError:
+        pass
+
+
+def train_model(name, cache_path, staging_dir, n_jobs):
+    """Train one model on the cached arrays (worker entry point)
+
+    The fitted model is saved to staging_dir; CV folds pass None and only
+    their test-set predictions are returned.
+    """
+    arrays = load_cached(cache_path)
+    is_keras = MODEL_SPECS[name][2]
+
+    start = time.perf_counter()
+    model = TRAINERS[name](arrays, n_jobs)
+    fit_seconds = time.perf_counter() - start
+
+    # Predict on the aligned test set shared by all models
+    if is_keras:
+        test_batches = WindowBatches(arrays['X_test_seq'], None, batch_size=256)
+        y_pred_scaled = model.predict(to_keras_sequence(test_batches), verbose=0).flatten()
+    else:
+        sequence_length = len(arrays['X_test_scaled']) - len(arrays['X_test_seq'])
+        y_pred_scaled = model.predict(arrays['X_test_scaled'][sequence_length:])
+
+    artifact = None
+    if staging_dir is not None:
+        artifact = os.path.join(staging_dir, MODEL_SPECS[name][1])
+        if is_keras:
+            model.save(artifact)
+        else:
+            joblib.dump(model, artifact)
+
+    return {
+        'name': name,
+        'y_pred_scaled': np.asarray(y_pred_scaled, dtype=np.float64),
+        'fit_seconds': fit_seconds,
+        'predict_seconds': time.perf_counter() - start - fit_seconds,
+        'artifact': artifact,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Orchestration
+# ---------------------------------------------------------------------------
+
+def evaluate(y_true, y_pred):
+    """Regression metrics in dollar space, keyed like metadata['metrics']"""
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+    return {
+        'r2': float(r2_score(y_true, y_pred)),
+        'mae': float(mean_absolute_error(y_true, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        'mape': float(np.mean(np.abs((y_true - y_pred) / y_true)) * 100),
+    }
+
+
+def predictions_in_dollars(cache_path, y_pred_scaled):
+    """Inverse-transform predictions and the aligned targets of one cache entry"""
+    scaler_y = joblib.load(os.path.join(cache_path, 'scaler_y.pkl'))
+    y_test_seq = load_cached(cache_path, ['X_test_scaled', 'y_test_scaled'])['y_test_seq']
+    y_true = scaler_y.inverse_transform(np.asarray(y_test_seq, dtype=np.float64).reshape(-1, 1)).flatten()
+    y_pred = scaler_y.inverse_transform(np.asarray(y_pred_scaled).reshape(-1, 1)).flatten()
+    return y_true, y_pred
+
+
+def plan_cpus(n_jobs, total_cpus=None):
+    """Split the CPU budget across concurrently running jobs"""
+    total_cpus = total_cpus or os.cpu_count() or 1
+    workers = max(1, min(n_jobs, total_cpus))
+    return workers, max(1, total_cpus // workers)
+
+
+def tensorflow_available():
+    try:
+        import importlib.util
+        return importlib.util.find_spec('tensorflow') is not None
+    except Exception:
+        return False
+
+
+def run_pipeline(data_path=DEFAULT_DATA_PATH, output_dir=DEFAULT_MODELS_DIR,
+                 cache_dir=DEFAULT_CACHE_DIR, models=None, total_cpus=None,
+                 cv_folds=CV_FOLDS, cv_scheme='expanding', cv_train_size=None):
+    """Train candidate models in a process pool and publish artifacts to output_dir
+
+    The final fits (on the chronological 80/20 split) and every (model, fold)
+    walk-forward evaluation are submitted to the same pool. When CV is enabled
+    the served model is the one with the best mean fold R².
+    """
+    run_start = time.perf_counter()
+    models = list(models or MODEL_SPECS)
+
+    if not tensorflow_available():
+        skipped = [m for m in models if MODEL_SPECS[m][2]]
+        if skipped:
+            print(f"⚠️  TensorFlow not installed, skipping: {skipped}")
+        models = [m for m in models if not MODEL_SPECS[m][2]]
+    if not models:
+        raise RuntimeError("No trainable models selected")
+
+    prep_start = time.perf_counter()
+    digest = file_digest(data_path)
+    cache_path = prepare_cached(data_path, cache_dir, digest=digest)
+    fold_paths = []
+    if cv_folds:
+        fold_paths = prepare_cv_folds(data_path, cache_dir, cv_folds, cv_scheme,
+                                      train_size=cv_train_size, digest=digest)
+    prepare_seconds = time.perf_counter() - prep_start
+    info = load_cache_info(cache_path)
+
+    # (model, fold) jobs; fold None is the final fit that gets published
+    jobs = [(name, None) for name in models]
+    jobs += [(name, k) for k in range(len(fold_paths)) for name in models]
+    workers, cpus_per_model = plan_cpus(len(jobs), total_cpus)
+    print(f"🚀 Training {len(models)} models x {1 + len(fold_paths)} splits: "
+          f"{workers} workers x {cpus_per_model} CPUs")
+
+    os.makedirs(output_dir, exist_ok=True)
+    staging_dir = os.path.join(output_dir, f'.staging-{os.getpid()}')
+    os.makedirs(staging_dir, exist_ok=True)
+
+    results = {}
+    fold_results = {name: [None] * len(fold_paths) for name in models}
+    try:
+        ctx = mp.get_context('spawn')  # TensorFlow is not fork-safe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(cpus_per_model,)) as pool:
+            futures = {}
+            for name, fold in jobs:
+                if fold is None:
+                    future = pool.submit(train_model, name, cache_path, staging_dir, cpus_per_model)
+                else:
+                    future = pool.submit(train_model, name, fold_paths[fold], None, cpus_per_model)
+                futures[future] = (name, fold)
+
+            for future in as_completed(futures):
+                name, fold = futures[future]
+                label = MODEL_SPECS[name][0] + ('' if fold is None else f' [fold {fold + 1}]')
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"❌ {label} failed: {e}")
+                    traceback.print_exc()
+                    continue
+                print(f"✅ {label}: {result['fit_seconds']:.1f}s")
+                if fold is None:
+                    results[name] = result
+                else:
+                    fold_results[name][fold] = result
+
+        if not results:
+            raise RuntimeError("All models failed to train")
+
+        # Evaluate in dollar space on the aligned test set
+        predictions = {}
+        for name, result in results.items():
+            y_true, predictions[name] = predictions_in_dollars(cache_path, result['y_pred_scaled'])
+        metrics = {name: evaluate(y_true, y_pred) for name, y_pred in predictions.items()}
+
+        # Inverse-MAE weighted ensemble (reported only - it has no single servable artifact)
+        if len(predictions) > 1:
+            names = list(predictions)
+            weights = np.array([1 / metrics[n]['mae'] for n in names])
+            weights = weights / weights.sum()
+            y_ensemble = sum(w * predictions[n] for w, n in zip(weights, names))
+            metrics['ensemble'] = evaluate(y_true, y_ensemble)
+            metrics['ensemble']['weights'] = {n: float(w) for n, w in zip(names, weights)}
+
+        cv = None
+        if fold_paths:
+            fold_metrics = {
+                name: [evaluate(*predictions_in_dollars(fold_paths[k], r['y_pred_scaled'])) if r else None
+                       for k, r in enumerate(fold_results[name])]
+                for name in models
+            }
+            cv = {
+                'scheme': cv_scheme,
+                'n_folds': len(fold_paths),
+                'folds': [load_cache_info(p)['bounds'] for p in fold_paths],
+                'metrics': fold_metrics,
+                'summary': summarize(fold_metrics),
+            }
+
+        def score(name):
+            if cv and name in cv['summary']:
+                return cv['summary'][name]['r2_mean']
+            return metrics[name]['r2']
+
+        ranked = sorted(results, key=score, reverse=True)
+        best = ranked[0]
+        served = next((n for n in ranked if not MODEL_SPECS[n][2]), None)
+
+        _publish(output_dir, staging_dir, cache_path, results, served)
+
+        metadata = {
+            'model_version': datetime.now().strftime('%Y%m%d-%H%M%S'),
+            'model_type': MODEL_SPECS[served][0] if served else MODEL_SPECS[best][0],
+            'trained_date': datetime.now().strftime('%Y-%m-%d'),
+            'n_features': len(info['feature_names']),
+            'feature_names': info['feature_names'],
+            'metrics': metrics,
+            'best_model': best,
+            'served_model': served,
+            'selected_by': 'cv_r2_mean' if cv else 'holdout_r2',
+            'top_correlations': info['top_correlations'],
+            # Caches written before feature_stats existed lack it; the webapp then
+            # falls back to the scaler's training range
+            'feature_stats': info.get('feature_stats'),
+            'data_shape': info['data_shape'],
+            'sequence_length': info['sequence_length'],
+            'trained_rows': info['data_shape']['train'][0],
+            'data_rows': info['data_rows'],
+            'data_end': info['data_end'],
+            'data_hash': info['cache_key'],
+            'timing': {
+                'prepare_seconds': round(prepare_seconds, 3),
+                'total_seconds': round(time.perf_counter() - run_start, 3),
+                'workers': workers,
+                'cpus_per_model': cpus_per_model,
+                'models': {
+                    n: {'fit_seconds': round(r['fit_seconds'], 3),
+                        'predict_seconds': round(r['predict_seconds'], 3)}
+                    for n, r in results.items()
+                },
+            },
+        }
+        if cv:
+            metadata['cv'] = cv
+            metadata['timing']['cv_fit_seconds'] = {
+                n: round(sum(r['fit_seconds'] for r in folds if r), 3)
+                for n, folds in fold_results.items()
+            }
+        joblib.dump(metadata, os.path.join(output_dir, 'metadata.pkl'))
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    print(f"🏆 Best model: {MODEL_SPECS[best][0]} (R² {metrics[best]['r2']:.4f})")
+    if served != best:
+        print(f"   Serving {metadata['model_type']} - the webapp cannot serve sequence models"
+              if served else "   ⚠️  No tree model trained - nothing servable was published")
+    if cv and best in cv['summary']:
+        s = cv['summary'][best]
+        print(f"   CV R²: {s['r2_mean']:.4f} ± {s['r2_std']:.4f} over {s['n_folds']} folds")
+    print(f"⏱️  Total: {metadata['timing']['total_seconds']:.1f}s -> {output_dir}")
+    return metadata
+
+
+def _publish(output_dir, staging_dir, cache_path, results, served):
+    """Move staged artifacts into output_dir in the layout load_models() reads"""
+    for name, result in results.items():
+        os.replace(result['artifact'], os.path.join(output_dir, MODEL_SPECS[name][1]))
+
+    for name in ('scaler_X.pkl', 'scaler_y.pkl'):
+        shutil.copyfile(os.path.join(cache_path, name), os.path.join(output_dir, name))
+    joblib.dump(load_cache_info(cache_path)['feature_names'],
+                os.path.join(output_dir, 'feature_names.pkl'))
+
+    # The webapp predicts from a single feature row, which LSTM/GRU models
+    # (trained on 30-step windows) cannot take. Serve the best tree model as
+    # best_model.pkl and keep Keras models under their own names only;
+    # load_models() would pick up a best_model.h5 first.
+    h5_path = os.path.join(output_dir, 'best_model.h5')
+    if os.path.exists(h5_path):
+        os.remove(h5_path)
+    pkl_path = os.path.join(output_dir, 'best_model.pkl')
+    if served is not None:
+        shutil.copyfile(os.path.join(output_dir, MODEL_SPECS[served][1]), pkl_path)
+    elif os.path.exists(pkl_path):
+        os.remove(pkl_path)  # would not match the freshly fitted scalers
+
+    # A full retrain supersedes incrementally refreshed versions
+    pointer = os.path.join(output_dir, 'CURRENT')
+    if os.path.exists(pointer):
+        os.remove(pointer)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train gold price models in parallel')
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help='Enhanced dataset (Parquet or CSV)')
+    parser.add_argument('--output', default=DEFAULT_MODELS_DIR, help='Models directory')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Prepared array cache')
+    parser.add_argument('--models', nargs='+', choices=list(MODEL_SPECS), help='Subset of models')
+    parser.add_argument('--jobs', type=int, default=None, help='Total CPUs to use (default: all)')
+    parser.add_argument('--cv-folds', type=int, default=CV_FOLDS, help='Walk-forward folds (0 disables CV)')
+    parser.add_argument('--cv-scheme', choices=SCHEMES, default='expanding', help='Training window per fold')
+    parser.add_argument('--cv-train-size', type=int, default=None, help='Rows per sliding training window')
+    args = parser.parse_args(argv)
+
+    run_pipeline(data_path=args.data, output_dir=args.output, cache_dir=args.cache_dir,
+                 models=args.models, total_cpus=args.jobs, cv_folds=args.cv_folds,
+                 cv_scheme=args.cv_scheme, cv_train_size=args.cv_train_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+"""
+Incremental Daily Model Refresh
+Folds new trading days into the existing models and publishes a new model version
+
+Usage:
+    python -m training.refresh                     # refresh the active version
+    python -m training.refresh --rounds 50 --window 500
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from .dataset import DEFAULT_DATA_PATH, TARGET_COL, clean_dataset, load_dataset
+from .pipeline import DEFAULT_MODELS_DIR, MODEL_SPECS, RANDOM_STATE, tensorflow_available
+from .sequences import create_sequences, to_keras_sequence, train_val_batches
+
+# Pointer file naming the active directory under <models>/versions/
+CURRENT_FILE = 'CURRENT'
+VERSIONS_DIR = 'versions'
+
+ADD_ROUNDS = 20        # boosting rounds appended to XGBoost/LightGBM
+ADD_TREES = 10         # trees appended to the Random Forest
+MAX_TREES = 400        # oldest RF trees are dropped beyond this
+WINDOW = 250           # recent rows the added rounds/trees are fit on
+FINE_TUNE_EPOCHS = 2   # LSTM/GRU epochs over the recent window
+KEEP_VERSIONS = 5
+
+
+# ---------------------------------------------------------------------------
+# Model versions
+# ---------------------------------------------------------------------------
+
+def active_model_dir(models_dir):
+    """Directory of the version load_models() serves (flat layout if no pointer)"""
+    pointer = os.path.join(models_dir, CURRENT_FILE)
+    if os.path.exists(pointer):
+        with open(pointer) as f:
+            version = f.read().strip()
+        version_dir = os.path.join(models_dir, VERSIONS_DIR, version)
+        if version and os.path.isdir(version_dir):
+            return version_dir
+    return models_dir
+
+
+def publish_version(models_dir, version_dir, keep=KEEP_VERSIONS):
+    """Point CURRENT at version_dir atomically and prune old versions"""
+    version = os.path.basename(version_dir)
+    tmp_pointer = os.path.join(models_dir, f'.{CURRENT_FILE}.tmp-{os.getpid()}')
+    with open(tmp_pointer, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_pointer, os.path.join(models_dir, CURRENT_FILE))
+
+    versions_root = os.path.join(models_dir, VERSIONS_DIR)
+    for old in sorted(os.listdir(versions_root))[:-keep]:
+        if old != version:
+            shutil.rmtree(os.path.join(versions_root, old), ignore_errors=True)
+
+
+# ---------------------------------------------------------------------------
+# Target rescaling
+# ---------------------------------------------------------------------------
+
+def remap_target(model, name, a, b):
+    """Rewrite a fitted model in place so its output becomes a * output + b
+
+    Used when scaler_y is refit: MinMax scaling is affine, so every model's
+    scaled output can be moved exactly into the new target space.
+    """
+    if name == 'random_forest':
+        for estimator in model.estimators_:
+            values = estimator.tree_.value
+            values *= a
+            values += b
+    elif name == 'xgboost':
+        import xgboost as xgb
+        raw = json.loads(model.get_booster().save_raw('json'))
+        learner = raw['learner']
+        for tree in learner['gradient_booster']['model']['trees']:
+            for i, child in enumerate(tree['left_children']):
+                if child == -1:  # leaf: split_conditions holds the leaf value
+                    tree['split_conditions'][i] *= a
+                    tree['base_weights'][i] *= a
+        params = learner['learner_model_param']
+        base = params['base_score']
+        if base.startswith('['):
+            values = [a * float(v) + b for v in base.strip('[]').split(',')]
+            params['base_score'] = '[' + ','.join(f'{v:E}' for v in values) + ']'
+        else:
+            params['base_score'] = f'{a * float(base) + b:E}'
+        booster = xgb.Booster()
+        booster.load_model(bytearray(json.dumps(raw).encode()))
+        model._Booster = booster
+    elif name == 'lightgbm':
+        import lightgbm as lgb
+        lines, tree = [], -1
+        for line in model.booster_.model_to_string().splitlines():
+            if line.startswith('tree_sizes='):
+                continue  # byte offsets are stale once leaf values change
+            if line.startswith('Tree='):
+                tree = int(line[5:])
+            elif line.startswith('leaf_value='):
+                # The first tree carries the init score, so it also takes the offset
+                values = np.array(line[11:].split(), dtype=np.float64) * a + (b if tree == 0 else 0.0)
+                line = 'leaf_value=' + ' '.join(repr(float(v)) for v in values)
+            lines.append(line)
+        model._Booster = lgb.Booster(model_str='\n'.join(lines) + '\n')
+    elif MODEL_SPECS[name][2]:
+        dense = model.layers[-1]
+        weights, bias = dense.get_weights()
+        dense.set_weights([weights * a, bias * a + b])
+    else:
+        raise ValueError(f"Cannot remap target for {name}")
+
+
+def refit_scaler_y(scaler_y, y_new):
+    """Extend scaler_y when new targets leave its range
+
+    Returns (a, b) mapping old scaled values to new scaled values, or None
+    when the range still covers the new data.
+    """
+    old_min, old_max = float(scaler_y.data_min_[0]), float(scaler_y.data_max_[0])
+    if y_new.min() >= old_min and y_new.max() <= old_max:
+        return None
+    scaler_y.partial_fit(y_new.reshape(-1, 1))
+    new_min, new_max = float(scaler_y.data_min_[0]), float(scaler_y.data_max_[0])
+    a = (old_max - old_min) / (new_max - new_min)
+    b = (old_min - new_min) / (new_max - new_min)
+    print(f"📏 scaler_y range drifted: [{old_min:.2f}, {old_max:.2f}] -> [{new_min:.2f}, {new_max:.2f}]")
+    return a, b
+
+
+# ---------------------------------------------------------------------------
+# Incremental fits
+# ---------------------------------------------------------------------------
+
+def _refresh_random_forest(model, X, y, add_trees, max_trees):
+    n_trees = len(model.estimators_)
+    if n_trees + add_trees > max_trees:
+        # Drop the oldest trees so the forest stays bounded
+        model.estimators_ = model.estimators_[n_trees + add_trees - max_trees:]
+        n_trees = len(model.estimators_)
+    n_jobs = model.n_jobs
+    model.set_params(warm_start=True, n_estimators=n_trees + add_trees, n_jobs=-1)
+    model.fit(X, y)
+    # Do not pickle the refresh-only settings into the served model
+    model.set_params(warm_start=False, n_jobs=n_jobs)
+    return model
+
+
+def _refresh_xgboost(model, X, y, add_rounds):
+    model.set_params(n_estimators=add_rounds, early_stopping_rounds=None)
+    model.fit(X, y, xgb_model=model.get_booster(), verbose=False)
+    return model
+
+
+def _refresh_lightgbm(model, X, y, add_rounds):
+    model.set_params(n_estimators=add_rounds)
+    model.fit(X, y, init_model=model.booster_)
+    return model
+
+
+def _refresh_recurrent(model, X, y, sequence_length, epochs):
+    import tensorflow as tf
+    tf.keras.utils.set_random_seed(RANDOM_STATE)
+    X_seq, y_seq = create_sequences(X, y, sequence_length)
+    if len(X_seq) == 0:
+        return model
+    batches, _ = train_val_batches(X_seq, y_seq, batch_size=32, validation_split=0.0, seed=RANDOM_STATE)
+    model.fit(to_keras_sequence(batches), epochs=epochs, verbose=0)
+    return model
+
+
+def _load_model(path, is_keras):
+    if is_keras:
+        from tensorflow import keras
+        # Recompile instead of restoring the saved config: legacy .h5 losses
+        # do not deserialize under Keras 3
+        model = keras.models.load_model(path, compile=False)
+        model.compile(optimizer='adam', loss='mse', metrics=['mae'])
+        return model
+    return joblib.load(path)
+
+
+def refresh(data_path=DEFAULT_DATA_PATH, models_dir=DEFAULT_MODELS_DIR, add_rounds=ADD_ROUNDS,
+            add_trees=ADD_TREES, max_trees=MAX_TREES, window=WINDOW, epochs=FINE_TUNE_EPOCHS):
+    """Refit the active version on rows it has not seen and publish a new version"""
+    start = time.perf_counter()
+    source_dir = active_model_dir(models_dir)
+    metadata = joblib.load(os.path.join(source_dir, 'metadata.pkl'))
+    feature_names = joblib.load(os.path.join(source_dir, 'feature_names.pkl'))
+    scaler_X = joblib.load(os.path.join(source_dir, 'scaler_X.pkl'))
+    scaler_y = joblib.load(os.path.join(source_dir, 'scaler_y.pkl'))
+
+    df = load_dataset(data_path)
+    df_clean = clean_dataset(df)
+    trained_rows = metadata.get('trained_rows')
+    if trained_rows is None:
+        raise RuntimeError("Active model has no 'trained_rows' - run python -m training.pipeline first")
+    if len(df_clean) < trained_rows:
+        raise RuntimeError("Dataset is shorter than the training set - run a full retrain")
+
+    # A full retrain fits on the first trained_rows and holds out the rest of
+    # data_rows, so the first refresh also folds in that holdout
+    n_unseen = len(df_clean) - trained_rows
+    n_new = max(0, len(df_clean) - metadata.get('data_rows', trained_rows))
+    if n_unseen == 0:
+        print("✅ Models already up to date")
+        return None
+    print(f"📈 {n_new} new rows since {metadata.get('data_end', 'last training')}"
+          + (f" (+{n_unseen - n_new} holdout rows)" if n_unseen > n_new else ""))
+
+    X = df_clean[feature_names].values
+    y = df_clean[TARGET_COL].values.astype(np.float64)
+
+    remap = refit_scaler_y(scaler_y, y[trained_rows:])
+
+    # Fit added rounds/trees on a recent window that always covers every new row
+    sequence_length = metadata.get('sequence_length', 30)
+    first = max(0, len(X) - max(window, n_unseen))
+    X_recent = scaler_X.transform(X[first:])
+    y_recent = scaler_y.transform(y[first:].reshape(-1, 1)).flatten()
+
+    version = datetime.now().strftime('%Y%m%d-%H%M%S')
+    version_dir = os.path.join(models_dir, VERSIONS_DIR, version)
+    staging_dir = f"{version_dir}.tmp-{os.getpid()}"
+    os.makedirs(staging_dir, exist_ok=True)
+
+    timings, refreshed = {}, []
+    try:
+        for name, (label, filename, is_keras) in MODEL_SPECS.items():
+            path = os.path.join(source_dir, filename)
+            if not os.path.exists(path):
+                continue
+            if is_keras and not tensorflow_available():
+                print(f"⚠️  {label}: TensorFlow not installed, copied unchanged")
+                shutil.copyfile(path, os.path.join(staging_dir, filename))
+                continue
+
+            t0 = time.perf_counter()
+            try:
+                model = _load_model(path, is_keras)
+                if remap is not None:
+                    remap_target(model, name, *remap)
+                if name == 'random_forest':
+                    model = _refresh_random_forest(model, X_recent, y_recent, add_trees, max_trees)
+                elif name == 'xgboost':
+                    model = _refresh_xgboost(model, X_recent, y_recent, add_rounds)
+                elif name == 'lightgbm':
+                    model = _refresh_lightgbm(model, X_recent, y_recent, add_rounds)
+                else:
+                    context = max(0, first - sequence_length)
+                    X_ctx = scaler_X.transform(X[context:])
+                    y_ctx = scaler_y.transform(y[context:].reshape(-1, 1)).flatten()
+                    model = _refresh_recurrent(model, X_ctx, y_ctx, sequence_length, epochs)
+            except Exception as e:
+                if remap is not None:
+                    # Its outputs would no longer match the refit scaler_y
+                    raise RuntimeError(f"{label} refresh failed after scaler_y refit: {e}") from e
+                print(f"⚠️  {label}: refresh failed ({e}), copied unchanged")
+                shutil.copyfile(path, os.path.join(staging_dir, filename))
+                continue
+
+            if is_keras:
+                model.save(os.path.join(staging_dir, filename))
+            else:
+                joblib.dump(model, os.path.join(staging_dir, filename))
+            timings[name] = round(time.perf_counter() - t0, 3)
+            refreshed.append(name)
+            print(f"✅ {label}: {timings[name]:.2f}s")
+
+        # The served pickle follows the same model as the source version
+        # ('fallback_model' in metadata written before 'served_model')
+        served = metadata.get('served_model', metadata.get('fallback_model'))
+        if served in MODEL_SPECS and not MODEL_SPECS[served][2]:
+            artifact = os.path.join(staging_dir, MODEL_SPECS[served][1])
+            if os.path.exists(artifact):
+                shutil.copyfile(artifact, os.path.join(staging_dir, 'best_model.pkl'))
+
+        joblib.dump(scaler_X, os.path.join(staging_dir, 'scaler_X.pkl'))
+        joblib.dump(scaler_y, os.path.join(staging_dir, 'scaler_y.pkl'))
+        joblib.dump(feature_names, os.path.join(staging_dir, 'feature_names.pkl'))
+
+        refreshed_metadata = dict(metadata)
+        refreshed_metadata.update({
+            'model_version': version,
+            'parent_version': metadata.get('model_version'),
+            'trained_date': datetime.now().strftime('%Y-%m-%d'),
+            'trained_rows': len(df_clean),
+            'data_rows': len(df_clean),
+            # The holdout metrics were measured before this refit and the
+            # holdout rows are now training data: keep them, labelled stale
+            'metrics_stale': True,
+            'metrics_version': metadata.get('metrics_version', metadata.get('model_version')),
+            'refresh': {
+                'new_rows': n_new,
+                'holdout_rows': n_unseen - n_new,
+                'window_rows': len(X_recent),
+                'scaler_y_refit': remap is not None,
+                'models': refreshed,
+                'seconds': timings,
+                'total_seconds': round(time.perf_counter() - start, 3),
+            },
+        })
+        if 'Date' in df.columns:
+            refreshed_metadata['data_end'] = str(df['Date'].iloc[-1])
+        joblib.dump(refreshed_metadata, os.path.join(staging_dir, 'metadata.pkl'))
+
+        os.replace(staging_dir, version_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    publish_version(models_dir, version_dir)
+    print(f"🚀 Published model version {version} "
+          f"({time.perf_counter() - start:.1f}s) -> {version_dir}")
+    return refreshed_metadata
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Incrementally refresh models with new trading days')
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help='Enhanced dataset (Parquet or CSV)')
+    parser.add_argument('--models-dir', default=DEFAULT_MODELS_DIR, help='Models directory')
+    parser.add_argument('--rounds', type=int, default=ADD_ROUNDS, help='Boosting rounds to add')
+    parser.add_argument('--trees', type=int, default=ADD_TREES, help='Random Forest trees to add')
+    parser.add_argument('--max-trees', type=int, default=MAX_TREES, help='Random Forest size cap')
+    parser.add_argument('--window', type=int, default=WINDOW, help='Recent rows to fit on')
+    parser.add_argument('--epochs', type=int, default=FINE_TUNE_EPOCHS, help='LSTM/GRU fine-tune epochs')
+    args = parser.parse_args(argv)
+
+    refresh(data_path=args.data, models_dir=args.models_dir, add_rounds=args.rounds,
+            add_trees=args.trees, max_trees=args.max_trees, window=args.window, epochs=args.epochs)
+
+
+if __name__ == '__main__':
+    main()
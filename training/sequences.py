@@ -0,0 +1,95 @@
+"""
+Sequence Windows for LSTM/GRU
+Zero-copy sliding windows over the scaled feature matrix, fed to Keras in batches
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+SEQUENCE_DTYPE = np.float32
+
+
+def create_sequences(X, y, sequence_length=30, dtype=SEQUENCE_DTYPE):
+    """Create sequences for LSTM/GRU as read-only views
+
+    X_seq[i] is X[i:i + sequence_length] and y_seq[i] is y[i + sequence_length],
+    matching the list-based builder from Train_Local.ipynb. X_seq shares memory
+    with X, so the window tensor costs no more than the feature matrix itself.
+    """
+    X = np.asarray(X, dtype=dtype)
+    y = np.asarray(y, dtype=dtype)
+    n_windows = len(X) - sequence_length
+
+    if n_windows <= 0:
+        return np.empty((0, sequence_length, X.shape[1]), dtype=dtype), np.empty(0, dtype=dtype)
+
+    # sliding_window_view appends the window axis last: (n, features, length)
+    windows = sliding_window_view(X, sequence_length, axis=0)[:n_windows]
+    return windows.transpose(0, 2, 1), y[sequence_length:]
+
+
+class WindowBatches:
+    """Batches of sequence windows materialized one at a time
+
+    Only batch_size windows are copied into a contiguous array per step, so peak
+    memory stays O(data) regardless of sequence_length.
+    """
+
+    def __init__(self, X_seq, y_seq, batch_size=32, indices=None, shuffle=False, seed=None):
+        self.X_seq = X_seq
+        self.y_seq = y_seq
+        self.batch_size = batch_size
+        self.indices = np.arange(len(X_seq)) if indices is None else np.asarray(indices)
+        self.shuffle = shuffle
+        self._rng = np.random.default_rng(seed)
+        self._order = self.indices.copy()
+        if shuffle:
+            self._rng.shuffle(self._order)
+
+    def __len__(self):
+        return int(np.ceil(len(self._order) / self.batch_size))
+
+    def __getitem__(self, idx):
+        batch = self._order[idx * self.batch_size:(idx + 1) * self.batch_size]
+        X_batch = np.ascontiguousarray(self.X_seq[batch])
+        if self.y_seq is None:
+            return X_batch
+        return X_batch, np.asarray(self.y_seq[batch])
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self._order = self.indices.copy()
+            self._rng.shuffle(self._order)
+
+
+def train_val_batches(X_seq, y_seq, batch_size=32, validation_split=0.2, seed=None):
+    """Chronological train/validation batches (same tail split as Keras validation_split)"""
+    n_val = int(len(X_seq) * validation_split)
+    split = len(X_seq) - n_val
+    train = WindowBatches(X_seq, y_seq, batch_size, np.arange(split), shuffle=True, seed=seed)
+    val = WindowBatches(X_seq, y_seq, batch_size, np.arange(split, len(X_seq)))
+    return train, val
+
+
+def to_keras_sequence(batches):
+    """Wrap WindowBatches in a keras.utils.Sequence for model.fit/predict"""
+    from tensorflow import keras
+
+    class KerasWindowBatches(keras.utils.Sequence):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def __len__(self):
+            return len(self.inner)
+
+        def __getitem__(self, idx):
+            return self.inner[idx]
+
+        def on_epoch_end(self):
+            self.inner.on_epoch_end()
+
+    return KerasWindowBatches(batches)
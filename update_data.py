@@ -0,0 +1,276 @@
+"""
+Gold Market Data Updater
+Incrementally pulls daily bars from Yahoo Finance and rebuilds the enhanced training dataset
+
+Raw bars are stored per ticker as yearly Parquet partitions
+(data/bars/<name>/<year>.parquet), so a daily update only downloads the
+missing days and rewrites the current year's file. The enhanced feature
+table is then recomputed with vectorized pandas/numpy and written to
+data/enhanced_gold_data_complete.parquet, which training reads by default.
+
+Usage:
+    python update_data.py                    # fetch missing bars + rebuild features
+    python update_data.py --start 2009-01-01 # initial backfill range
+    python update_data.py --skip-fetch       # rebuild features from stored bars only
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(PROJECT_DIR, 'data')
+BARS_DIR = os.path.join(DATA_DIR, 'bars')
+ENHANCED_PATH = os.path.join(DATA_DIR, 'enhanced_gold_data_complete.parquet')
+
+DEFAULT_START = '2009-01-01'
+OVERLAP_DAYS = 5  # re-fetch a few days so late revisions replace stored bars
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# name -> Yahoo ticker. Same sources as fetch_latest_features() in webapp/app.py,
+# plus the CHF and 10Y yield series the enhanced features need.
+TICKERS = {
+    'Gold': 'GC=F',
+    'GLD': 'GLD',
+    'Silver': 'SI=F',
+    'Oil': 'CL=F',
+    'DXY': 'DX-Y.NYB',
+    'CHF': 'CHF=X',
+    'TNX': '^TNX',
+}
+GLD_MULTIPLIER = 10.9  # GLD ~ 1/10.9 of spot, as in fetch_latest_features()
+
+# Indicator parameters
+EMA_SPAN = 20
+STOCH_PERIOD = 14
+STOCH_SMOOTH = 3
+CCI_PERIODS = (3, 9)
+VOLATILITY_WINDOW = 20
+
+# Column order of the enhanced dataset (feature_names.pkl is this minus Date and Gold_Close)
+ENHANCED_COLUMNS = [
+    'Date',
+    'Gold_Open', 'Gold_High', 'Gold_Low', 'Gold_Close', 'Gold_Volume',
+    'Silver_Open', 'Silver_High', 'Silver_Low', 'Silver_Close', 'Silver_Volume',
+    'G/S_Open', 'G/S_High', 'G/S_Low', 'G/S_Close',
+    'Gold_SlowD', 'Silver_SlowD', 'Gold_EMA', 'Silver_EMA',
+    'Gold_CCI3', 'Silver_CCI3', 'Gold_CCI9', 'Silver_CCI9',
+    'Oil_Open', 'Oil_High', 'Oil_Low', 'Oil_Close', 'Oil_Volume',
+    'CHF_Open', 'CHF_High', 'CHF_Low', 'CHF_Close',
+    'DXY_Open', 'DXY_High', 'DXY_Low', 'DXY_Close',
+    'TNX_Open', 'TNX_High', 'TNX_Low', 'TNX_Close',
+    'Gold_Oil_Ratio', 'Gold_DXY_Inverse', 'Gold_Yield_Spread', 'Oil_Volatility', 'CHF_Volatility',
+]
+
+
+# ---------------------------------------------------------------------------
+# Raw bar storage
+# ---------------------------------------------------------------------------
+
+def load_bars(name):
+    """All stored bars for a ticker, indexed by date"""
+    ticker_dir = os.path.join(BARS_DIR, name)
+    if not os.path.isdir(ticker_dir):
+        return pd.DataFrame(columns=OHLCV, index=pd.DatetimeIndex([], name='Date'))
+    parts = sorted(f for f in os.listdir(ticker_dir) if f.endswith('.parquet'))
+    if not parts:
+        return pd.DataFrame(columns=OHLCV, index=pd.DatetimeIndex([], name='Date'))
+    return pd.concat([pd.read_parquet(os.path.join(ticker_dir, p)) for p in parts]).sort_index()
+
+
+def last_stored_date(name):
+    """Last stored date, reading only the newest partition"""
+    ticker_dir = os.path.join(BARS_DIR, name)
+    if not os.path.isdir(ticker_dir):
+        return None
+    parts = sorted(f for f in os.listdir(ticker_dir) if f.endswith('.parquet'))
+    if not parts:
+        return None
+    return pd.read_parquet(os.path.join(ticker_dir, parts[-1])).index.max()
+
+
+def append_bars(name, new_bars):
+    """Merge new bars into the yearly partitions they fall in"""
+    ticker_dir = os.path.join(BARS_DIR, name)
+    os.makedirs(ticker_dir, exist_ok=True)
+    for year, chunk in new_bars.groupby(new_bars.index.year):
+        path = os.path.join(ticker_dir, f'{year}.parquet')
+        if os.path.exists(path):
+            chunk = pd.concat([pd.read_parquet(path), chunk])
+            chunk = chunk[~chunk.index.duplicated(keep='last')]
+        tmp_path = f'{path}.tmp-{os.getpid()}'
+        chunk.sort_index().to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+
+# ---------------------------------------------------------------------------
+# Fetching
+# ---------------------------------------------------------------------------
+
+def download_bars(ticker, start, end):
+    """Daily OHLCV from Yahoo Finance with flat columns"""
+    import yfinance as yf
+    data = yf.download(ticker, start=start, end=end, progress=False, auto_adjust=True)
+    if data is None or len(data) == 0:
+        return None
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+    data = data.reindex(columns=OHLCV)
+    data.index = pd.to_datetime(data.index).tz_localize(None).normalize()
+    data.index.name = 'Date'
+    return data.dropna(subset=['Close']).astype('float64')
+
+
+def update_ticker(name, ticker, start=DEFAULT_START, end=None):
+    """Fetch only the bars missing for one ticker; returns number of rows fetched"""
+    last = last_stored_date(name)
+    fetch_start = start if last is None else (last - timedelta(days=OVERLAP_DAYS)).strftime('%Y-%m-%d')
+    end = end or (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+    try:
+        bars = download_bars(ticker, fetch_start, end)
+    except Exception as e:
+        print(f"❌ {name} ({ticker}): {str(e)[:50]}")
+        return 0
+    if bars is None:
+        print(f"⚠️  {name} ({ticker}): No data")
+        return 0
+
+    append_bars(name, bars)
+    new_rows = len(bars) if last is None else int((bars.index > last).sum())
+    print(f"✅ {name} ({ticker}): {new_rows} new bars, last {bars.index.max().date()}")
+    return new_rows
+
+
+def update_all(start=DEFAULT_START, end=None, max_workers=len(TICKERS)):
+    """Fetch missing bars for every ticker concurrently"""
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {name: pool.submit(update_ticker, name, ticker, start, end)
+                   for name, ticker in TICKERS.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+# ---------------------------------------------------------------------------
+# Enhanced features (vectorized)
+# ---------------------------------------------------------------------------
+
+def _rolling_mad(values, window):
+    """Rolling mean absolute deviation via strided windows (no Python loop)"""
+    out = np.full(len(values), np.nan)
+    if len(values) < window:
+        return out
+    windows = sliding_window_view(values, window)
+    out[window - 1:] = np.abs(windows - windows.mean(axis=1, keepdims=True)).mean(axis=1)
+    return out
+
+
+def cci(high, low, close, period):
+    """Commodity Channel Index"""
+    typical = (high + low + close) / 3
+    mean = typical.rolling(period).mean()
+    mad = pd.Series(_rolling_mad(typical.to_numpy(dtype=np.float64), period), index=typical.index)
+    return (typical - mean) / (0.015 * mad.replace(0, np.nan))
+
+
+def slow_d(high, low, close, period=STOCH_PERIOD, smooth=STOCH_SMOOTH):
+    """Slow stochastic %D"""
+    lowest = low.rolling(period).min()
+    highest = high.rolling(period).max()
+    fast_k = 100 * (close - lowest) / (highest - lowest).replace(0, np.nan)
+    slow_k = fast_k.rolling(smooth).mean()
+    return slow_k.rolling(smooth).mean()
+
+
+def build_enhanced(bars):
+    """Join tickers on the gold trading calendar and compute the enhanced columns
+
+    Derived column definitions:
+        G/S_*             Gold_* / Silver_*
+        *_SlowD           slow stochastic %D (14, 3, 3)
+        *_EMA             EMA of close (span 20)
+        *_CCI3 / *_CCI9   commodity channel index over 3 / 9 days
+        Gold_Oil_Ratio    Gold_Close / Oil_Close
+        Gold_DXY_Inverse  Gold_Close / DXY_Close
+        Gold_Yield_Spread gold 1-day return (%) minus the 10Y yield (%)
+        *_Volatility      20-day std of daily returns (%)
+    """
+    gold = bars['Gold']
+    if 'GLD' in bars and len(bars['GLD']) > 0:
+        # Fill futures gaps from the ETF, scaled to spot like the webapp does
+        gld = bars['GLD'][['Open', 'High', 'Low', 'Close']] * GLD_MULTIPLIER
+        gold = gold.combine_first(gld.assign(Volume=bars['GLD']['Volume']))
+    if len(gold) == 0:
+        raise RuntimeError("No gold bars stored - run without --skip-fetch first")
+
+    df = pd.DataFrame(index=gold.index)
+    for name in ('Gold', 'Silver', 'Oil', 'CHF', 'DXY', 'TNX'):
+        source = gold if name == 'Gold' else bars.get(name)
+        if source is None or len(source) == 0:
+            aligned = pd.DataFrame(np.nan, index=df.index, columns=OHLCV)
+        else:
+            # Other markets trade on different calendars; carry a few days forward
+            aligned = source.reindex(df.index, method='ffill', limit=5)
+        for col in OHLCV:
+            df[f'{name}_{col}'] = aligned[col].astype('float64')
+
+    for col in ('Open', 'High', 'Low', 'Close'):
+        df[f'G/S_{col}'] = df[f'Gold_{col}'] / df[f'Silver_{col}'].replace(0, np.nan)
+
+    for metal in ('Gold', 'Silver'):
+        high, low, close = df[f'{metal}_High'], df[f'{metal}_Low'], df[f'{metal}_Close']
+        df[f'{metal}_SlowD'] = slow_d(high, low, close)
+        df[f'{metal}_EMA'] = close.ewm(span=EMA_SPAN, adjust=False).mean()
+        for period in CCI_PERIODS:
+            df[f'{metal}_CCI{period}'] = cci(high, low, close, period)
+
+    df['Gold_Oil_Ratio'] = df['Gold_Close'] / df['Oil_Close'].replace(0, np.nan)
+    df['Gold_DXY_Inverse'] = df['Gold_Close'] / df['DXY_Close'].replace(0, np.nan)
+    df['Gold_Yield_Spread'] = df['Gold_Close'].pct_change() * 100 - df['TNX_Close']
+    df['Oil_Volatility'] = df['Oil_Close'].pct_change().rolling(VOLATILITY_WINDOW).std() * 100
+    df['CHF_Volatility'] = df['CHF_Close'].pct_change().rolling(VOLATILITY_WINDOW).std() * 100
+
+    df = df.replace([np.inf, -np.inf], np.nan)
+    df.index.name = 'Date'
+    df = df.reset_index()
+    df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+    return df[ENHANCED_COLUMNS]
+
+
+def write_enhanced(df, path=ENHANCED_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Incrementally update gold market data')
+    parser.add_argument('--start', default=DEFAULT_START, help='Backfill start for tickers with no data')
+    parser.add_argument('--end', default=None, help='Fetch end date (default: tomorrow)')
+    parser.add_argument('--output', default=ENHANCED_PATH, help='Enhanced dataset (Parquet)')
+    parser.add_argument('--skip-fetch', action='store_true', help='Only rebuild features from stored bars')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if not args.skip_fetch:
+        print(f"📊 Fetching missing bars for {len(TICKERS)} tickers...")
+        update_all(args.start, args.end)
+    fetch_seconds = time.perf_counter() - start
+
+    bars = {name: load_bars(name) for name in TICKERS}
+    df = build_enhanced(bars)
+    write_enhanced(df, args.output)
+
+    print(f"✅ Enhanced dataset: {len(df):,} rows x {df.shape[1]} columns, "
+          f"{df['Date'].iloc[0]} to {df['Date'].iloc[-1]}")
+    print(f"⏱️  Fetch {fetch_seconds:.1f}s, features {time.perf_counter() - start - fetch_seconds:.2f}s "
+          f"-> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Admission Control
+Per-route concurrency limits with bounded wait queues and fast 503 load shedding
+
+Expensive endpoints (live prediction, matplotlib rendering) are grouped into
+route classes. Each class admits at most `limit` concurrent requests per
+worker process and lets at most `queue_size` more wait up to `wait_timeout`
+seconds; anything beyond that is rejected immediately with 503 and a
+Retry-After header. Routes not in a class (health, static files, metrics
+JSON) are never queued, so they stay responsive under overload.
+
+Limits are per process. Under threaded workers a queued request parks its
+worker thread while it waits. With a thread count configured, every class
+can hold limit + queue_size threads. The total must leave `reserved_threads`
+free for unlimited routes, or the controller refuses to start. Under gevent
+workers waiters are greenlets, so there is no thread budget to check.
+"""
+import os
+import threading
+import time
+
+from flask import g, jsonify, request
+
+try:
+    from .cooperative import cooperative
+except ImportError:  # running as a script: python webapp/app.py
+    from cooperative import cooperative
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+class RouteLimiter:
+    """Concurrency limit plus bounded wait queue for one route class"""
+
+    def __init__(self, name, limit, queue_size, wait_timeout):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.wait_timeout = wait_timeout
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.max_waiting = 0
+        self.total_wait_seconds = 0.0
+
+    def acquire(self):
+        """Admit the caller; returns None on success or the rejection reason"""
+        with self._cond:
+            if self.in_flight < self.limit and self.waiting == 0:
+                self.in_flight += 1
+                self.admitted += 1
+                return None
+            if self.waiting >= self.queue_size:
+                self.rejected_queue_full += 1
+                return 'queue_full'
+
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            start = time.monotonic()
+            deadline = start + self.wait_timeout
+            try:
+                while self.in_flight >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected_timeout += 1
+                        return 'timeout'
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+                self.admitted += 1
+                self.total_wait_seconds += time.monotonic() - start
+                return None
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'limit': self.limit,
+                'queue_size': self.queue_size,
+                'in_flight': self.in_flight,
+                'queue_depth': self.waiting,
+                'max_queue_depth': self.max_waiting,
+                'admitted': self.admitted,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_timeout': self.rejected_timeout,
+                'avg_wait_ms': round(1000 * self.total_wait_seconds / self.admitted, 2) if self.admitted else 0.0,
+            }
+
+
+class AdmissionController:
+    """Maps Flask endpoints to route classes and sheds load with 503s"""
+
+    def __init__(self, route_classes, retry_after=5, threads=None, reserved_threads=0):
+        # route_classes: {class_name: (limit, queue_size, wait_timeout, [endpoints])}
+        self.retry_after = retry_after
+        self.threads = threads
+        self.reserved_threads = reserved_threads
+        self.held_threads = {}  # other long-lived holders, e.g. open streams
+        self.limiters = {}
+        self.endpoint_class = {}
+        for name, (limit, queue_size, wait_timeout, endpoints) in route_classes.items():
+            self.limiters[name] = RouteLimiter(name, limit, queue_size, wait_timeout)
+            for endpoint in endpoints:
+                self.endpoint_class[endpoint] = name
+        self.check_thread_budget()
+
+    def threads_held(self):
+        """Most threads the route classes and other holders can occupy at once"""
+        return (sum(l.limit + l.queue_size for l in self.limiters.values())
+                + sum(self.held_threads.values()))
+
+    def check_thread_budget(self):
+        """Raise ValueError if limited routes could starve the unlimited ones"""
+        if self.threads is None:
+            return
+        available = self.threads - self.reserved_threads
+        held = self.threads_held()
+        if held > available:
+            parts = [f"{n}={l.limit}+{l.queue_size}" for n, l in self.limiters.items()]
+            parts += [f"{n}={c}" for n, c in self.held_threads.items()]
+            raise ValueError(
+                f"Admission limits and queues can hold {held} threads ({', '.join(parts)}), "
+                f"but only {available} of {self.threads} are available after reserving "
+                f"{self.reserved_threads} for unlimited routes. Lower these limits "
+                f"or raise GUNICORN_THREADS.")
+
+    def hold_threads(self, name, count):
+        """Count a long-lived thread holder against the budget (raises ValueError)"""
+        self.held_threads[name] = count
+        self.check_thread_budget()
+
+    def classify(self, endpoint):
+        return self.endpoint_class.get(endpoint)
+
+    def before_request(self):
+        limiter = self.limiters.get(self.classify(request.endpoint))
+        if limiter is None:
+            return None
+        reason = limiter.acquire()
+        if reason is not None:
+            print(f"🚦 Shed {request.method} {request.path} ({limiter.name}: {reason})")
+            response = jsonify({
+                'success': False,
+                'error': 'Server is busy, please retry shortly',
+                'reason': reason,
+                'retry_after': self.retry_after
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = str(self.retry_after)
+            return response
+        g.admission_limiter = limiter
+        return None
+
+    def teardown_request(self, exc=None):
+        limiter = g.pop('admission_limiter', None)
+        if limiter is not None:
+            limiter.release()
+
+    def stats(self):
+        return {
+            'pid': os.getpid(),
+            'retry_after': self.retry_after,
+            'threads': self.threads,
+            'reserved_threads': self.reserved_threads,
+            'threads_held_max': self.threads_held(),
+            'routes': {name: limiter.stats() for name, limiter in self.limiters.items()},
+        }
+
+    def init_app(self, app):
+        """Register hooks; call before other before_request handlers so shedding runs first"""
+        app.before_request(self.before_request)
+        app.teardown_request(self.teardown_request)
+
+
+def default_controller():
+    """Controller for the gold prediction app, configurable via ADMISSION_* env vars
+
+    GUNICORN_THREADS is the --threads count for gthread workers; it is
+    ignored under gevent.
+    """
+    queue_size = _env_int('ADMISSION_QUEUE_SIZE', 1)
+    wait_timeout = _env_float('ADMISSION_WAIT_TIMEOUT', 10)
+    return AdmissionController({
+        # Live Yahoo fetch + model inference
+        'predict': (_env_int('ADMISSION_PREDICT_LIMIT', 2), queue_size, wait_timeout,
+                    ['api_predict', 'api_explain']),
+        # matplotlib pyplot keeps global state - render one figure at a time
+        'render': (_env_int('ADMISSION_RENDER_LIMIT', 1), queue_size, wait_timeout,
+                   ['plot_comparison', 'metrics_table']),
+    }, retry_after=_env_int('ADMISSION_RETRY_AFTER', 5),
+       threads=None if cooperative() else _env_int('GUNICORN_THREADS', 8),
+       reserved_threads=_env_int('ADMISSION_RESERVED_THREADS', 2))
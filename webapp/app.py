@@ -3,7 +3,7 @@ Gold Price Prediction Web Application
 Flask API for predicting gold prices using trained ML models
 With model performance visualization
 """
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response
 import numpy as np
 import pandas as pd
 import joblib
@@ -18,6 +18,23 @@ import seaborn as sns
 from io import BytesIO
 import base64
 
+try:
+    from .admission import default_controller
+    from .inference_server import InferenceClient, InferenceUnavailable
+    from .profiling import profiling, require_token
+    from .explain import Explainer, explain_matrix, format_explanation
+    from .drift import DriftMonitor
+    from .stream import StreamFull, UpdateBroadcaster
+    from .cooperative import cooperative, offload, run_blocking
+except ImportError:  # running as a script: python webapp/app.py
+    from admission import default_controller
+    from inference_server import InferenceClient, InferenceUnavailable
+    from profiling import profiling, require_token
+    from explain import Explainer, explain_matrix, format_explanation
+    from drift import DriftMonitor
+    from stream import StreamFull, UpdateBroadcaster
+    from cooperative import cooperative, offload, run_blocking
+
 # Get the directory where this file is located
 WEBAPP_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -26,6 +43,14 @@ app = Flask(__name__,
             template_folder=os.path.join(WEBAPP_DIR, 'templates'),
             static_folder=os.path.join(WEBAPP_DIR, 'static'))
 
+# Admission control runs before any other hook so overloaded requests are
+# shed before they trigger model loading or logging work
+admission = default_controller()
+admission.init_app(app)
+
+# Token-guarded CPU/memory profiling under /debug/profile (off unless PROFILING_TOKEN is set)
+app.register_blueprint(profiling)
+
 # Add request logging middleware
 @app.before_request
 def log_request():
@@ -34,9 +59,11 @@ def log_request():
     print(f"🌐 {request.method} {request.path} from {request.remote_addr}")
     
     # Auto-load models on first request if not loaded
-    if model is None and not request.path.startswith('/static'):
+    if feature_names is None and not request.path.startswith('/static'):
         print("📦 Auto-loading models on first request...")
         load_models()
+    elif not request.path.startswith('/static'):
+        maybe_reload_models()
 
 @app.after_request
 def log_response(response):
@@ -68,10 +95,28 @@ def get_models_dir():
     return webapp_models
 
 MODEL_DIR = get_models_dir()
-SCALER_X_PATH = os.path.join(MODEL_DIR, 'scaler_X.pkl')
-SCALER_Y_PATH = os.path.join(MODEL_DIR, 'scaler_y.pkl')
-FEATURE_NAMES_PATH = os.path.join(MODEL_DIR, 'feature_names.pkl')
-METADATA_PATH = os.path.join(MODEL_DIR, 'metadata.pkl')
+
+# Incremental refreshes publish to MODEL_DIR/versions/<version> and point
+# MODEL_DIR/CURRENT at the active one (see training/refresh.py)
+CURRENT_VERSION_PATH = os.path.join(MODEL_DIR, 'CURRENT')
+MODEL_CHECK_INTERVAL = float(os.environ.get('MODEL_CHECK_INTERVAL', 30))
+
+# Enhanced dataset written by update_data.py, used for the as-of explanation history
+PROJECT_DIR = os.path.dirname(WEBAPP_DIR)
+ENHANCED_DATA_PATHS = [
+    os.path.join(PROJECT_DIR, 'data', 'enhanced_gold_data_complete.parquet'),
+    os.path.join(PROJECT_DIR, 'enhanced_gold_data_complete.csv'),
+]
+EXPLAIN_HISTORY_ROWS = int(os.environ.get('EXPLAIN_HISTORY_ROWS', 750))
+explainer = Explainer(features_ttl=float(os.environ.get('EXPLAIN_FEATURES_TTL', 300)))
+
+# Live feature vectors vs training distribution, per worker process
+drift_monitor = DriftMonitor(min_observations=int(os.environ.get('DRIFT_MIN_OBSERVATIONS', 100)))
+
+# Optional split mode: one inference server process owns the model and the
+# web workers send it feature rows (see inference_server.py)
+INFERENCE_SOCKET = os.environ.get('INFERENCE_SOCKET')
+inference_client = InferenceClient(INFERENCE_SOCKET) if INFERENCE_SOCKET else None
 
 # Global variables
 model = None
@@ -79,63 +124,99 @@ scaler_X = None
 scaler_y = None
 feature_names = None
 metadata = None
+model_version = None
+_active_pointer = None
+_last_model_check = 0.0
+
+def read_version_pointer():
+    """Return the version named in MODEL_DIR/CURRENT, or None for the flat layout"""
+    try:
+        with open(CURRENT_VERSION_PATH) as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    if version and os.path.isdir(os.path.join(MODEL_DIR, 'versions', version)):
+        return version
+    return None
+
+def maybe_reload_models():
+    """Reload models if a new version was published (checked every MODEL_CHECK_INTERVAL s)"""
+    global _last_model_check
+    now = datetime.now().timestamp()
+    if now - _last_model_check < MODEL_CHECK_INTERVAL:
+        return
+    _last_model_check = now
+    if read_version_pointer() != _active_pointer:
+        print("🔄 New model version published, reloading...")
+        load_models()
 
 def load_models():
     """Load trained models and scalers"""
-    global model, scaler_X, scaler_y, feature_names, metadata
+    global model, scaler_X, scaler_y, feature_names, metadata, model_version, _active_pointer
     
     try:
-        print(f"📂 Models directory: {MODEL_DIR}")
-        
-        # Load scalers and feature names first
-        scaler_X = joblib.load(SCALER_X_PATH)
-        scaler_y = joblib.load(SCALER_Y_PATH)
-        feature_names = joblib.load(FEATURE_NAMES_PATH)
+        pointer = read_version_pointer()
+        active_dir = os.path.join(MODEL_DIR, 'versions', pointer) if pointer else MODEL_DIR
+        print(f"📂 Models directory: {active_dir}")
+        
+        # Load into locals first so a failed reload keeps serving the old version
+        new_scaler_X = joblib.load(os.path.join(active_dir, 'scaler_X.pkl'))
+        new_scaler_y = joblib.load(os.path.join(active_dir, 'scaler_y.pkl'))
+        new_feature_names = joblib.load(os.path.join(active_dir, 'feature_names.pkl'))
         print("✅ Loaded scalers and features")
         
-        # Try different model file formats
-        model_loaded = False
-        
-        # Try loading Keras model (.h5)
-        h5_path = os.path.join(MODEL_DIR, 'best_model.h5')
-        if os.path.exists(h5_path):
-            try:
-                from tensorflow import keras
-                model = keras.models.load_model(h5_path)
-                print("✅ Loaded Keras model (best_model.h5)")
-                model_loaded = True
-            except Exception as e:
-                print(f"⚠️  Could not load .h5 model: {e}")
-        
-        # Try loading pickle model
-        if not model_loaded:
-            for model_file in ['best_model.pkl', 'best_model_metadata.pkl']:
-                model_path = os.path.join(MODEL_DIR, model_file)
-                if os.path.exists(model_path):
-                    try:
-                        model = joblib.load(model_path)
-                        print(f"✅ Loaded pickle model ({model_file})")
-                        model_loaded = True
-                        break
-                    except Exception as e:
-                        continue
-        
-        if not model_loaded:
-            print("❌ No model file found!")
-            return False
+        # In split mode the model lives in the inference server process
+        new_model = None
+        if inference_client is None:
+            # Try loading Keras model (.h5)
+            h5_path = os.path.join(active_dir, 'best_model.h5')
+            if os.path.exists(h5_path):
+                try:
+                    from tensorflow import keras
+                    new_model = keras.models.load_model(h5_path, compile=False)  # inference only
+                    if new_model.input_shape[1] not in (None, 1):
+                        # predict_prices feeds one timestep; a windowed LSTM/GRU would fail on every request
+                        print(f"⚠️  Skipping best_model.h5: expects {new_model.input_shape[1]} timesteps")
+                        new_model = None
+                    else:
+                        print("✅ Loaded Keras model (best_model.h5)")
+                except Exception as e:
+                    print(f"⚠️  Could not load .h5 model: {e}")
+        
+            # Try loading pickle model
+            if new_model is None:
+                for model_file in ['best_model.pkl', 'best_model_metadata.pkl']:
+                    model_path = os.path.join(active_dir, model_file)
+                    if os.path.exists(model_path):
+                        try:
+                            new_model = joblib.load(model_path)
+                            print(f"✅ Loaded pickle model ({model_file})")
+                            break
+                        except Exception as e:
+                            continue
+        
+            if new_model is None:
+                print("❌ No model file found!")
+                return False
         
         # Try to load metadata (contains performance metrics)
         try:
-            metadata = joblib.load(METADATA_PATH)
+            new_metadata = joblib.load(os.path.join(active_dir, 'metadata.pkl'))
             print("✅ Models and metadata loaded successfully")
         except:
-            metadata = {
+            new_metadata = {
                 'model_type': 'Unknown',
                 'trained_date': 'Unknown',
                 'metrics': {}
             }
             print("⚠️  Models loaded, but no metadata found")
         
+        model, scaler_X, scaler_y = new_model, new_scaler_X, new_scaler_y
+        feature_names, metadata = new_feature_names, new_metadata
+        model_version = new_metadata.get('model_version') or pointer or 'base'
+        _active_pointer = pointer
+        drift_monitor.configure(new_feature_names, new_scaler_X, new_metadata.get('feature_stats'), model_version)
+        print(f"🏷️  Model version: {model_version}")
         return True
     except Exception as e:
         print(f"❌ Error loading models: {e}")
@@ -206,6 +287,7 @@ def fetch_latest_features():
         
         # Build features matching the model's expected input
         features = {}
+        defaults = []  # features filled with typical values instead of market data
         
         # Basic OHLCV for Gold - apply multiplier for ETF conversion
         features['Gold_Open'] = get_last_value(gold, 'Open') * gold_price_multiplier
@@ -228,6 +310,7 @@ def fetch_latest_features():
             features['Silver_Low'] = 30.5
             features['Silver_Close'] = 31.0
             features['Silver_Volume'] = 100000
+            defaults.extend(['Silver_Open', 'Silver_High', 'Silver_Low', 'Silver_Close', 'Silver_Volume'])
         
         # Gold/Silver ratios
         if features['Silver_Close'] > 0:
@@ -240,6 +323,7 @@ def fetch_latest_features():
             features['G/S_High'] = 76
             features['G/S_Low'] = 74
             features['G/S_Close'] = 75
+            defaults.extend(['G/S_Open', 'G/S_High', 'G/S_Low', 'G/S_Close'])
         
         # Technical indicators - apply multiplier
         if gold is not None and len(gold) >= 30:
@@ -265,6 +349,7 @@ def fetch_latest_features():
             else:
                 features['Gold_Return_1d'] = 0
                 features['Gold_Return_7d'] = 0
+                defaults.extend(['Gold_Return_1d', 'Gold_Return_7d'])
         else:
             # Default values
             features['Gold_MA7'] = features['Gold_Close']
@@ -275,28 +360,38 @@ def fetch_latest_features():
             features['Gold_Volatility_30'] = 20
             features['Gold_Return_1d'] = 0
             features['Gold_Return_7d'] = 0
+            defaults.extend(['Gold_MA7', 'Gold_MA14', 'Gold_MA30', 'Gold_Volatility_7', 'Gold_Volatility_14',
+                             'Gold_Volatility_30', 'Gold_Return_1d', 'Gold_Return_7d'])
         
         # Oil data
         if oil is not None and len(oil) > 0:
             features['Oil_Close'] = get_last_value(oil, 'Close')
         else:
             features['Oil_Close'] = 75.0  # Typical oil price
+            defaults.append('Oil_Close')
         
         # USD Index
         if usd is not None and len(usd) > 0:
             features['DXY_Close'] = get_last_value(usd, 'Close')
         else:
             features['DXY_Close'] = 105.0  # Typical DXY value
+            defaults.append('DXY_Close')
         
         # Additional ratios if needed
         if features['Oil_Close'] > 0:
             features['Gold_Oil_Ratio'] = features['Gold_Close'] / features['Oil_Close']
         else:
             features['Gold_Oil_Ratio'] = 30
+            defaults.append('Gold_Oil_Ratio')
         
         print(f"✅ Current Gold Price: ${features['Gold_Close']:.2f} per troy ounce")
         print(f"📈 Features extracted: {len(features)}")
+        if defaults:
+            print(f"⚠️  Using default values for {len(defaults)} features: {defaults[:5]}...")
         
+        # Keys starting with '_' are metadata, not model inputs
+        features['_as_of'] = str(gold.index[-1].date())  # date of the latest bar
+        features['_defaults'] = defaults
         return features
         
     except Exception as e:
@@ -304,63 +399,87 @@ def fetch_latest_features():
         traceback.print_exc()
         return None
 
-def predict_next_day(features_dict):
-    """Predict next day gold price"""
+def build_feature_vector(features_dict):
+    """Feature vector in model order; returns (vector, names of missing features)"""
+    # Create feature vector in correct order
+    feature_vector = []
+    missing_features = []
+    
+    for fname in feature_names:
+        if fname in features_dict:
+            feature_vector.append(features_dict[fname])
+        else:
+            feature_vector.append(0)
+            missing_features.append(fname)
+    
+    # Check for NaN or inf values
+    feature_vector = np.array(feature_vector, dtype=np.float64)
+    if np.any(np.isnan(feature_vector)) or np.any(np.isinf(feature_vector)):
+        print(f"⚠️  Invalid values in features, replacing with 0")
+        feature_vector = np.nan_to_num(feature_vector, nan=0.0, posinf=0.0, neginf=0.0)
+    return feature_vector, missing_features
+
+def predict_prices(X):
+    """Scale an (n, n_features) matrix, run the model and return prices in dollars"""
+    X_scaled = scaler_X.transform(X)
+    
+    # Predict - handle both Keras and sklearn models
+    try:
+        # For Keras models (LSTM/GRU) - needs 3D input
+        if hasattr(model, 'predict') and 'tensorflow' in str(type(model)):
+            # Reshape for LSTM input: (batch, timesteps, features)
+            X_scaled_3d = X_scaled.reshape(len(X_scaled), 1, -1)
+            y_scaled = model.predict(X_scaled_3d, verbose=0)
+        else:
+            # For sklearn models
+            y_scaled = model.predict(X_scaled)
+    except:
+        # Fallback - try as-is
+        y_scaled = model.predict(X_scaled)
+    
+    # Inverse transform
+    return scaler_y.inverse_transform(np.asarray(y_scaled).reshape(-1, 1)).ravel()
+
+def predict_next_day(features_dict, sources=None):
+    """Predict next day gold price
+
+    Appends 'model' or 'baseline:<reason>' to `sources` if given, so callers
+    can record one source per served request.
+    """
+    if sources is None:
+        sources = []
     try:
         current_price = features_dict.get('Gold_Close', 2000)
+        fallback_reason = 'no_model'
         
-        # If model is properly loaded, use it
-        if model is not None and hasattr(model, 'predict'):
-            # Create feature vector in correct order
-            feature_vector = []
-            missing_features = []
-            
-            for fname in feature_names:
-                if fname in features_dict:
-                    feature_vector.append(features_dict[fname])
-                else:
-                    feature_vector.append(0)
-                    missing_features.append(fname)
-            
+        # If model is properly loaded (here or in the inference server), use it
+        model_ready = inference_client is not None or (model is not None and hasattr(model, 'predict'))
+        if model_ready and feature_names is not None:
+            feature_vector, missing_features = build_feature_vector(features_dict)
             if missing_features and len(missing_features) < 10:
                 print(f"⚠️  Missing features (using 0): {missing_features[:5]}...")
             
-            # Check for NaN or inf values
-            feature_vector = np.array(feature_vector, dtype=np.float64)
-            if np.any(np.isnan(feature_vector)) or np.any(np.isinf(feature_vector)):
-                print(f"⚠️  Invalid values in features, replacing with 0")
-                feature_vector = np.nan_to_num(feature_vector, nan=0.0, posinf=0.0, neginf=0.0)
-            
-            # Scale features
-            X = feature_vector.reshape(1, -1)
-            X_scaled = scaler_X.transform(X)
-            
-            # Predict - handle both Keras and sklearn models
+            # Predict in this process, or via the inference server in split mode
             try:
-                # For Keras models (LSTM/GRU) - needs 3D input
-                if hasattr(model, 'predict') and 'tensorflow' in str(type(model)):
-                    # Reshape for LSTM input: (batch, timesteps, features)
-                    X_scaled_3d = X_scaled.reshape(1, 1, -1)
-                    y_scaled = model.predict(X_scaled_3d, verbose=0)
+                if inference_client is not None:
+                    y_pred = float(inference_client.predict(feature_vector.reshape(1, -1))[0])
                 else:
-                    # For sklearn models
-                    y_scaled = model.predict(X_scaled)
-            except:
-                # Fallback - try as-is
-                y_scaled = model.predict(X_scaled)
-            
-            # Inverse transform
-            if len(y_scaled.shape) > 1:
-                y_pred = scaler_y.inverse_transform(y_scaled.reshape(-1, 1))[0][0]
-            else:
-                y_pred = scaler_y.inverse_transform([[y_scaled[0]]])[0][0]
+                    y_pred = float(predict_prices(feature_vector.reshape(1, -1))[0])
+            except InferenceUnavailable as e:
+                print(f"⚠️  Inference server unavailable: {e}")
+                y_pred = None
+                fallback_reason = 'inference_unavailable'
             
             # Sanity check: prediction should be within 10% of current price
-            if y_pred < 100 or y_pred > 10000 or abs(y_pred - current_price) > current_price * 0.15:
+            if y_pred is None:
+                pass  # Fall through to baseline prediction
+            elif y_pred < 100 or y_pred > 10000 or abs(y_pred - current_price) > current_price * 0.15:
                 print(f"⚠️  Model prediction unreasonable: ${y_pred:.2f} (current: ${current_price:.2f})")
+                fallback_reason = 'unreasonable'
                 # Fall through to baseline prediction
             else:
                 print(f"✅ Model predicted: ${y_pred:.2f} (current: ${current_price:.2f})")
+                sources.append('model')
                 return float(y_pred)
         
         # Baseline prediction using simple trend analysis
@@ -388,23 +507,25 @@ def predict_next_day(features_dict):
         y_pred = current_price * (1 + predicted_change)
         
         print(f"✅ Baseline predicted: ${y_pred:.2f} (change: {predicted_change*100:+.2f}%, current: ${current_price:.2f})")
+        sources.append(f'baseline:{fallback_reason}')
         return float(y_pred)
         
     except Exception as e:
         print(f"❌ Error predicting: {e}")
         traceback.print_exc()
         # Ultimate fallback - return current price with tiny change
+        sources.append('baseline:error')
         current_price = features_dict.get('Gold_Close', 2000)
         return float(current_price * 1.001)
 
-def predict_week_range(current_features):
+def predict_week_range(current_features, sources=None):
     """Predict price range for next week"""
     try:
         predictions = []
         
         # Predict 7 days ahead
         for day in range(7):
-            pred = predict_next_day(current_features)
+            pred = predict_next_day(current_features, sources)
             if pred is not None:
                 predictions.append(pred)
                 # Update features for next prediction (simplified)
@@ -423,14 +544,14 @@ def predict_week_range(current_features):
         print(f"Error predicting week: {e}")
         return None
 
-def predict_month_range(current_features):
+def predict_month_range(current_features, sources=None):
     """Predict price range for next month"""
     try:
         predictions = []
         
         # Predict 30 days ahead
         for day in range(30):
-            pred = predict_next_day(current_features)
+            pred = predict_next_day(current_features, sources)
             if pred is not None:
                 predictions.append(pred)
                 current_features['Gold_Close'] = pred
@@ -475,6 +596,7 @@ def home():
         }), 500
 
 @app.route('/api/predict', methods=['POST'])
+@offload
 def api_predict():
     """API endpoint for predictions"""
     try:
@@ -489,6 +611,9 @@ def api_predict():
                 'error': 'Failed to fetch market data'
             }), 500
         
+        observe_drift(features)
+        sources = []
+        
         result = {
             'success': True,
             'timestamp': datetime.now().isoformat(),
@@ -499,7 +624,7 @@ def api_predict():
         
         # Predict based on type
         if prediction_type == 'day':
-            next_day = predict_next_day(features)
+            next_day = predict_next_day(features, sources)
             if next_day:
                 result['prediction'] = {
                     'next_day': next_day,
@@ -510,19 +635,20 @@ def api_predict():
                 return jsonify({'success': False, 'error': 'Prediction failed'}), 500
                 
         elif prediction_type == 'week':
-            week_pred = predict_week_range(features.copy())
+            week_pred = predict_week_range(features.copy(), sources)
             if week_pred:
                 result['prediction'] = week_pred
             else:
                 return jsonify({'success': False, 'error': 'Week prediction failed'}), 500
                 
         elif prediction_type == 'month':
-            month_pred = predict_month_range(features.copy())
+            month_pred = predict_month_range(features.copy(), sources)
             if month_pred:
                 result['prediction'] = month_pred
             else:
                 return jsonify({'success': False, 'error': 'Month prediction failed'}), 500
         
+        record_prediction_source(sources)
         return jsonify(result)
         
     except Exception as e:
@@ -533,16 +659,213 @@ def api_predict():
             'error': str(e)
         }), 500
 
+def record_prediction_source(sources):
+    """Count one served request: 'model' only if every step used the model"""
+    if sources:
+        drift_monitor.record_prediction(next((s for s in sources if s != 'model'), 'model'))
+
+def observe_drift(features):
+    """Feed the served feature vector to the drift monitor (never fails the request)"""
+    if feature_names is None:
+        return
+    try:
+        vector, missing = build_feature_vector(features)
+        drift_monitor.observe(vector, features.get('_defaults', []), missing)
+    except Exception as e:
+        print(f"⚠️  Drift monitor error: {e}")
+
+def explain_kwargs():
+    """Model access for explain_matrix: the local model, or the inference server in split mode"""
+    # Occlusion baseline: training means when the metadata has them, else the range midpoint
+    stats = ((metadata or {}).get('feature_stats') or {}).get('features', {})
+    baseline = [stats[n]['mean'] for n in feature_names] if all(n in stats for n in feature_names) else None
+    if inference_client is not None:
+        return {'scaler_X': scaler_X, 'predict_fn': inference_client.predict, 'baseline': baseline}
+    return {'model': model, 'scaler_X': scaler_X, 'scaler_y': scaler_y, 'predict_fn': predict_prices,
+            'baseline': baseline}
+
+def start_explain_history():
+    """Kick off (or return) the as-of history for the current model version"""
+    data_path = next((p for p in ENHANCED_DATA_PATHS if os.path.exists(p)), None)
+    if data_path is None:
+        return None
+    return explainer.start_history(model_version, data_path, feature_names, EXPLAIN_HISTORY_ROWS,
+                                   **explain_kwargs())
+
+@app.route('/api/explain')
+@offload
+def api_explain():
+    """Per-feature contributions (USD) for the current prediction, or ?date=YYYY-MM-DD from history"""
+    try:
+        if feature_names is None or scaler_X is None:
+            return jsonify({'success': False, 'error': 'Models not loaded'}), 503
+        top = request.args.get('top', type=int)
+        
+        date = request.args.get('date')
+        if date:
+            history = start_explain_history()
+            if history is None:
+                return jsonify({'success': False, 'error': 'Enhanced dataset not available for history'}), 404
+            if history['status'] == 'computing':
+                return jsonify({'success': False, 'status': 'computing',
+                                'message': 'Explanation history is being computed, retry shortly'}), 202
+            if history['status'] == 'failed':
+                return jsonify({'success': False, 'error': history['error']}), 500
+            # self.history may already be a newer version's 'computing' placeholder
+            entry = explainer.history_entry(history, date, feature_names, top)
+            if entry is None:
+                return jsonify({'success': False, 'error': f'No history for {date}'}), 404
+            entry.update({'success': True, 'model_version': history['model_version'], 'unit': 'USD'})
+            return jsonify(entry)
+        
+        # Live view: repeated calls reuse the same fetch and the cached result
+        features = explainer.live_features(fetch_latest_features)
+        if features is None:
+            return jsonify({'success': False, 'error': 'Failed to fetch market data'}), 500
+        as_of = features.get('_as_of')
+        
+        def compute():
+            vector, missing = build_feature_vector(features)
+            contributions, base_values, outputs, method = explain_matrix(vector[None, :], **explain_kwargs())
+            entry = format_explanation(feature_names, vector, contributions[0], base_values[0], outputs[0], method)
+            entry['missing_features'] = missing
+            return entry
+        
+        entry, cached = explainer.cached((model_version, as_of), compute)
+        result = dict(entry, contributions=entry['contributions'][:top] if top else entry['contributions'])
+        result.update({
+            'success': True,
+            'model_version': model_version,
+            'as_of': as_of,
+            'current_price': features.get('Gold_Close', 0),
+            'cached': cached,
+            'unit': 'USD'
+        })
+        return jsonify(result)
+        
+    except Exception as e:
+        print(f"Explain Error: {e}")
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/explain/history')
+def explain_history():
+    """Start the background as-of history if needed and report cache/history status"""
+    if feature_names is not None and scaler_X is not None:
+        start_explain_history()
+    return jsonify(dict(explainer.stats(), model_version=model_version))
+
+@app.route('/api/drift')
+def drift_stats():
+    """Live feature drift vs training distribution, default and fallback counters (this worker)"""
+    stats = drift_monitor.stats(top=request.args.get('top', type=int))
+    stats['pid'] = os.getpid()
+    return jsonify(stats)
+
+@app.route('/api/drift/reset', methods=['POST'])
+def drift_reset():
+    """Start a new observation window (operators only: X-Profiling-Token header)"""
+    require_token()
+    drift_monitor.reset()
+    return jsonify({'success': True, 'pid': os.getpid()})
+
+def stream_update(features):
+    """Payload pushed to /api/stream clients when the inputs change"""
+    observe_drift(features)
+    sources = []
+    next_day = predict_next_day(features, sources)
+    record_prediction_source(sources)
+    current_price = features.get('Gold_Close', 0)
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'as_of': features.get('_as_of'),
+        'model_version': model_version,
+        'current_price': current_price,
+        'unit': 'USD per troy ounce',
+        'prediction': {
+            'next_day': next_day,
+            'change': next_day - current_price,
+            'change_percent': (next_day - current_price) / current_price * 100 if current_price else 0
+        }
+    }
+
+STREAM_INTERVAL = float(os.environ.get('STREAM_INTERVAL', 60))
+STREAM_BUFFER = int(os.environ.get('STREAM_BUFFER', 16))
+# Idle streams are greenlets under gevent; under gthread each one holds a thread
+STREAM_MAX_CLIENTS = int(os.environ.get('STREAM_MAX_CLIENTS', 1000 if cooperative() else 1))
+
+def stream_producer(max_clients):
+    """Broadcaster that fetches and predicts in this process (also used by the inference server)"""
+    return UpdateBroadcaster(
+        fetch_fn=lambda: run_blocking(fetch_latest_features),
+        compute_fn=lambda features: run_blocking(stream_update, features),
+        version_fn=lambda: model_version,
+        interval=STREAM_INTERVAL,
+        buffer_size=STREAM_BUFFER,
+        max_clients=max_clients
+    )
+
+if inference_client is not None:
+    # Split mode: the inference server runs the only producer and this worker
+    # relays its updates, so W workers still cost one computation per change
+    broadcaster = UpdateBroadcaster(feed=inference_client.updates, buffer_size=STREAM_BUFFER,
+                                    max_clients=STREAM_MAX_CLIENTS)
+else:
+    broadcaster = stream_producer(STREAM_MAX_CLIENTS)
+# No-op under gevent, where the admission controller has no thread budget
+admission.hold_threads('stream', broadcaster.max_clients)
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-sent events with live price and next-day prediction updates"""
+    try:
+        subscription = broadcaster.subscribe(request.headers.get('Last-Event-ID', type=int))
+    except StreamFull:
+        response = jsonify({
+            'success': False,
+            'error': 'Too many live connections, please retry shortly',
+            'retry_after': admission.retry_after
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(admission.retry_after)
+        return response
+    return Response(subscription, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/stream/stats')
+def stream_stats():
+    """Subscriber count and refresh/recompute (or relay) counters for this worker's stream"""
+    return jsonify(dict(broadcaster.stats(), pid=os.getpid()))
+
 @app.route('/health')
 def health_check():
     """Health check endpoint for deployment monitoring"""
-    models_loaded = model is not None and scaler_X is not None
+    if inference_client is not None:
+        # Split mode: healthy when the inference server answers
+        server = inference_client.status()
+        models_loaded = server is not None and feature_names is not None
+        served_version = server['model_version'] if server else None
+    else:
+        server = None
+        models_loaded = model is not None and scaler_X is not None
+        served_version = model_version
     return jsonify({
         'status': 'healthy' if models_loaded else 'unhealthy',
         'models_loaded': models_loaded,
+        'model_version': served_version,
+        'inference': 'remote' if inference_client is not None else 'local',
+        'inference_server': server,
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/admission')
+def admission_stats():
+    """Per-route concurrency, queue depth and rejection counters for this worker"""
+    return jsonify(admission.stats())
+
 @app.route('/debug')
 def debug_info():
     """Debug endpoint to check configuration"""
@@ -565,7 +888,7 @@ def get_metrics():
     """Get model performance metrics"""
     try:
         # Try to load models if not already loaded
-        if model is None or metadata is None:
+        if feature_names is None or metadata is None:
             load_models()
         
         if metadata is None:
@@ -585,9 +908,14 @@ def get_metrics():
             'success': True,
             'model_type': model_type,
             'trained_date': trained_date,
+            'model_version': model_version,
             'n_features': n_features,
             'metrics': metrics_data,
-            'top_correlations': metadata.get('top_correlations', {})
+            # After an incremental refresh the metrics belong to an older version
+            'metrics_stale': metadata.get('metrics_stale', False),
+            'metrics_version': metadata.get('metrics_version', model_version),
+            'top_correlations': metadata.get('top_correlations', {}),
+            'cv': metadata.get('cv', {})  # Walk-forward per-fold metrics and summary
         })
     except Exception as e:
         print(f"Error loading metrics: {e}")
@@ -598,6 +926,7 @@ def get_metrics():
         }), 200
 
 @app.route('/api/plot/comparison')
+@offload
 def plot_comparison():
     """Generate model comparison plot"""
     try:
@@ -662,6 +991,7 @@ def plot_comparison():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/plot/metrics_table')
+@offload
 def metrics_table():
     """Generate detailed metrics table image"""
     try:
@@ -0,0 +1,39 @@
+"""
+Cooperative Workers
+Helpers for running under gunicorn's gevent worker class
+
+With `-k gevent` every connection is a greenlet, so thousands of idle
+/api/stream clients cost no OS threads. Native code that blocks without
+yielding (yfinance's curl_cffi downloads, model inference, matplotlib) would
+stall every greenlet in the worker, so expensive views run on gevent's
+native thread pool instead. Under threaded workers both helpers are no-ops.
+"""
+import functools
+
+
+def cooperative():
+    """True when gevent has monkey-patched this process (gunicorn -k gevent)"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def run_blocking(fn, *args, **kwargs):
+    """Call fn on a native thread under gevent, directly otherwise"""
+    if not cooperative():
+        return fn(*args, **kwargs)
+    import gevent
+    return gevent.get_hub().threadpool.apply(fn, args, kwargs)
+
+
+def offload(view):
+    """Decorator: run a Flask view (with its request context) via run_blocking"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not cooperative():
+            return view(*args, **kwargs)
+        from flask import copy_current_request_context
+        return run_blocking(copy_current_request_context(view), *args, **kwargs)
+    return wrapper
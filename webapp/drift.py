@@ -0,0 +1,182 @@
+"""
+Feature Drift Monitor
+Streaming comparison of served feature vectors against the training distribution
+
+Per feature it keeps running moments (Welford) and counts per fixed histogram
+bin, so memory stays O(n_features) however many requests are observed. PSI is
+computed against the training histogram from metadata['feature_stats']
+(written by training/pipeline.py); for models trained before that existed,
+only the scaler's training range is known, so the out-of-range rate is
+reported instead. Below `min_observations` a 10-bin histogram is mostly noise
+(one vector puts every feature at PSI > 1), so features are reported as
+'insufficient_data' without a PSI.
+"""
+import threading
+from collections import Counter
+
+import numpy as np
+
+DEFAULT_BINS = 10
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+PSI_EPSILON = 1e-4  # floor for empty bins so log(actual / expected) stays finite
+MIN_OBSERVATIONS = 100
+
+
+def scaled_bin_index(X_scaled, bins=DEFAULT_BINS):
+    """Histogram bin per value: 0 = below training range, 1..bins, bins + 1 = above
+
+    Must match training/dataset.py:scaled_bin_index (the webapp image ships
+    without the training package).
+    """
+    idx = np.clip(np.floor(X_scaled * bins), 0, bins - 1) + 1
+    idx = np.where(X_scaled < 0, 0, np.where(X_scaled > 1, bins + 1, idx))
+    return idx.astype(np.intp)
+
+
+def psi(actual, expected):
+    """Population stability index per row of two (n_features, n_bins) proportion arrays"""
+    actual = np.maximum(actual, PSI_EPSILON)
+    expected = np.maximum(expected, PSI_EPSILON)
+    return ((actual - expected) * np.log(actual / expected)).sum(axis=1)
+
+
+class DriftMonitor:
+    """Thread-safe streaming drift counters for one worker process"""
+
+    def __init__(self, min_observations=MIN_OBSERVATIONS):
+        self.min_observations = min_observations
+        self._lock = threading.Lock()
+        self.model_version = None
+        self.feature_names = []
+        self.reference = None
+        self.bins = DEFAULT_BINS
+        self.expected = None
+        self._reset()
+
+    def configure(self, feature_names, scaler_X, feature_stats=None, model_version=None):
+        """(Re)bind to a model's training statistics; counters reset on version change"""
+        if model_version == self.model_version and list(feature_names) == self.feature_names:
+            return
+        with self._lock:
+            self.model_version = model_version
+            self.feature_names = list(feature_names)
+            self._index = {name: j for j, name in enumerate(self.feature_names)}
+            self._scale = np.asarray(scaler_X.scale_, dtype=np.float64)
+            self._offset = np.asarray(scaler_X.min_, dtype=np.float64)
+            self.train_min = np.asarray(scaler_X.data_min_, dtype=np.float64)
+            self.train_max = np.asarray(scaler_X.data_max_, dtype=np.float64)
+
+            stats = (feature_stats or {}).get('features', {})
+            if stats and all(name in stats for name in self.feature_names):
+                self.reference = 'training_stats'
+                self.bins = feature_stats['bins']
+                self.train_mean = np.array([stats[n]['mean'] for n in self.feature_names])
+                self.train_std = np.array([stats[n]['std'] for n in self.feature_names])
+                self.expected = np.array([stats[n]['hist'] for n in self.feature_names])
+            else:
+                self.reference = 'scaler_range'
+                self.bins = DEFAULT_BINS
+                self.train_mean = self.train_std = self.expected = None
+            self._reset()
+
+    def _reset(self):
+        n_features = len(self.feature_names)
+        self.n = 0
+        self._mean = np.zeros(n_features)
+        self._m2 = np.zeros(n_features)
+        self._counts = np.zeros((n_features, self.bins + 2), dtype=np.int64)
+        self._defaults = np.zeros(n_features, dtype=np.int64)
+        self._missing = np.zeros(n_features, dtype=np.int64)
+        self.observations_with_defaults = 0
+        self.predictions = Counter()
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def observe(self, vector, defaults=(), missing=()):
+        """Add one served feature vector (model order, unscaled)"""
+        if not self.feature_names:
+            return
+        vector = np.asarray(vector, dtype=np.float64)
+        idx = scaled_bin_index(vector * self._scale + self._offset, self.bins)
+        with self._lock:
+            self.n += 1
+            delta = vector - self._mean
+            self._mean += delta / self.n
+            self._m2 += delta * (vector - self._mean)
+            self._counts[np.arange(len(idx)), idx] += 1
+            for name in defaults:
+                if name in self._index:
+                    self._defaults[self._index[name]] += 1
+            for name in missing:
+                self._missing[self._index[name]] += 1
+            if defaults:
+                self.observations_with_defaults += 1
+
+    def record_prediction(self, source):
+        """Count where a prediction came from: 'model' or 'baseline:<reason>'"""
+        with self._lock:
+            self.predictions[source] += 1
+
+    def stats(self, top=None):
+        with self._lock:
+            n = self.n
+            predictions = dict(self.predictions)
+            result = {
+                'model_version': self.model_version,
+                'reference': self.reference,
+                'observations': n,
+                'min_observations': self.min_observations,
+                'observations_with_defaults': self.observations_with_defaults,
+                'predictions': predictions,
+                'baseline_fallback_rate': round(
+                    sum(v for k, v in predictions.items() if k.startswith('baseline')) / sum(predictions.values()), 4
+                ) if predictions else 0.0,
+            }
+            if n == 0:
+                result['features'] = []
+                return result
+
+            std = np.sqrt(self._m2 / n)
+            counts = self._counts.copy()
+            out_of_range = (counts[:, 0] + counts[:, -1]) / n
+            enough = n >= self.min_observations
+            scores = psi(counts / n, self.expected) if self.expected is not None and enough else None
+            features = []
+            for j, name in enumerate(self.feature_names):
+                entry = {
+                    'feature': name,
+                    'live_mean': float(self._mean[j]),
+                    'live_std': float(std[j]),
+                    'train_min': float(self.train_min[j]),
+                    'train_max': float(self.train_max[j]),
+                    'out_of_range_rate': round(float(out_of_range[j]), 4),
+                    'defaults_used': int(self._defaults[j]),
+                    'missing': int(self._missing[j]),
+                }
+                if self.train_mean is not None:
+                    entry.update({
+                        'train_mean': float(self.train_mean[j]),
+                        'train_std': float(self.train_std[j]),
+                        'mean_shift_std': float((self._mean[j] - self.train_mean[j]) / self.train_std[j])
+                        if self.train_std[j] > 0 else None,
+                    })
+                if not enough:
+                    entry['status'] = 'insufficient_data'
+                elif scores is not None:
+                    entry['psi'] = round(float(scores[j]), 4)
+                    entry['status'] = ('drifted' if scores[j] >= PSI_SIGNIFICANT
+                                       else 'moderate' if scores[j] >= PSI_MODERATE else 'stable')
+                else:
+                    entry['status'] = 'drifted' if out_of_range[j] > 0.5 else 'stable'
+                features.append(entry)
+
+        key = (lambda e: e['psi']) if scores is not None else (lambda e: e['out_of_range_rate'])
+        features.sort(key=key, reverse=True)
+        result['drifted_features'] = sum(e['status'] == 'drifted' for e in features)
+        if scores is not None:
+            result['max_psi'] = features[0]['psi']
+        result['features'] = features[:top] if top else features
+        return result
@@ -0,0 +1,239 @@
+"""
+Prediction Explanations
+Per-feature contributions in dollars, cached per (model version, data date)
+
+XGBoost and LightGBM use their built-in TreeSHAP (pred_contribs/pred_contrib),
+sklearn tree ensembles use shap.TreeExplainer (a requirement) or, without shap,
+an exact decision-path decomposition read from each estimator's tree_, and
+everything else (Keras, split inference mode) falls back to vectorized
+occlusion: each feature is swapped for a baseline value and all variants are
+scored in a single predict call.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+HISTORY_BATCH_ROWS = 256
+HISTORY_RETRY_SECONDS = 60  # a failed history is recomputed after this long
+
+
+def _path_contributions(model, X_scaled):
+    """Decision-path decomposition for sklearn trees/forests (Saabas)
+
+    Every split on a sample's path moves the node mean from parent to child;
+    that change is credited to the split feature. The root mean plus all
+    credits is exactly the leaf value, so contributions add up to the prediction.
+    """
+    estimators = getattr(model, 'estimators_', [model])
+    X_scaled = np.asarray(X_scaled, dtype=np.float32)
+    contributions = np.zeros(X_scaled.shape)
+    bias = 0.0
+    for estimator in estimators:
+        tree = estimator.tree_
+        value = tree.value[:, 0, 0]
+        parent = np.full(tree.node_count, -1)
+        for children in (tree.children_left, tree.children_right):
+            split = children != -1
+            parent[children[split]] = np.flatnonzero(split)
+        child = np.flatnonzero(parent >= 0)
+        # credits[c, feature of c's parent] = value[c] - value[parent]
+        credits = sparse.csr_matrix(
+            (value[child] - value[parent[child]], (child, tree.feature[parent[child]])),
+            shape=(tree.node_count, X_scaled.shape[1]))
+        contributions += (estimator.decision_path(X_scaled) @ credits).toarray()
+        bias += value[0]
+    return contributions / len(estimators), np.full(len(X_scaled), bias / len(estimators)), 'tree_path'
+
+
+def _tree_contributions(model, X_scaled):
+    """(contributions, bias, method) in scaled target units, or None if unsupported"""
+    module = type(model).__module__
+    if hasattr(model, 'get_booster'):
+        import xgboost as xgb
+        booster = model.get_booster()
+        matrix = xgb.DMatrix(X_scaled, feature_names=booster.feature_names)
+        values = booster.predict(matrix, pred_contribs=True)
+        return values[:, :-1], values[:, -1], 'xgboost_treeshap'
+    if module.startswith('lightgbm'):
+        values = np.asarray(model.predict(X_scaled, pred_contrib=True))
+        return values[:, :-1], values[:, -1], 'lightgbm_treeshap'
+    if module.startswith('sklearn.ensemble') or module.startswith('sklearn.tree'):
+        try:
+            import shap
+        except ImportError:
+            return _path_contributions(model, X_scaled)
+        explainer = shap.TreeExplainer(model)
+        values = np.asarray(explainer.shap_values(X_scaled))
+        bias = np.full(len(X_scaled), float(np.ravel(explainer.expected_value)[0]))
+        return values, bias, 'treeshap'
+    return None
+
+
+def occlusion_contributions(X, predict_fn, baseline):
+    """Vectorized occlusion in dollars: f(x) - f(x with feature j set to baseline)
+
+    Builds all n * (n_features + 1) variants at once so the model is called once.
+    Returns (contributions, base_values, outputs, method): occlusion effects are
+    not additive, so outputs holds the model's actual f(x) per row.
+    """
+    n, n_features = X.shape
+    variants = np.repeat(X[:, None, :], n_features + 1, axis=1)
+    idx = np.arange(n_features)
+    variants[:, idx + 1, idx] = baseline[idx]
+    scored = np.asarray(predict_fn(np.vstack([variants.reshape(-1, n_features), baseline[None, :]])))
+    base_value = float(scored[-1])
+    scored = scored[:-1].reshape(n, n_features + 1)
+    contributions = scored[:, :1] - scored[:, 1:]
+    return contributions, np.full(n, base_value), scored[:, 0], 'occlusion'
+
+
+def explain_matrix(X, model=None, scaler_X=None, scaler_y=None, predict_fn=None, baseline=None):
+    """(contributions, base_values, outputs, method) in dollars for each row of the unscaled matrix X"""
+    X = np.asarray(X, dtype=np.float64)
+    if model is not None:
+        result = _tree_contributions(model, scaler_X.transform(X))
+        if result is not None:
+            contributions, bias, method = result
+            # MinMax inverse is affine: y = (y_scaled - min_) / scale_
+            scale, offset = float(scaler_y.scale_[0]), float(scaler_y.min_[0])
+            contributions, bias = contributions / scale, (bias - offset) / scale
+            # TreeSHAP is exact: the contributions add up to the prediction
+            return contributions, bias, bias + contributions.sum(axis=1), method
+    if baseline is None:
+        baseline = (scaler_X.data_min_ + scaler_X.data_max_) / 2
+    return occlusion_contributions(X, predict_fn, np.asarray(baseline, dtype=np.float64))
+
+
+def format_explanation(feature_names, values, contributions, base_value, model_output, method, top=None):
+    """JSON-ready explanation for one row, largest absolute contributions first"""
+    order = np.argsort(-np.abs(contributions))
+    if top:
+        order = order[:top]
+    return {
+        'method': method,
+        'base_value': float(base_value),
+        'model_output': float(model_output),
+        'contributions': [{
+            'feature': feature_names[i],
+            'value': float(values[i]),
+            'contribution': float(contributions[i]),
+        } for i in order],
+    }
+
+
+class Explainer:
+    """LRU of live explanations plus a background-computed as-of history"""
+
+    def __init__(self, max_entries=64, features_ttl=300):
+        self.max_entries = max_entries
+        self.features_ttl = features_ttl
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._live = None  # (fetched_at, features)
+        self.history = None  # {'model_version', 'status', 'dates', ...}
+        self.hits = 0
+        self.misses = 0
+
+    def live_features(self, fetch):
+        """Latest market features, refetched at most every features_ttl seconds"""
+        with self._lock:
+            live = self._live
+        if live is not None and time.monotonic() - live[0] < self.features_ttl:
+            return live[1]
+        features = fetch()
+        if features is not None:
+            with self._lock:
+                self._live = (time.monotonic(), features)
+        return features
+
+    def cached(self, key, compute):
+        """Memoize compute() under key, e.g. (model_version, data_date)"""
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key], True
+            self.misses += 1
+        result = compute()
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result, False
+
+    def start_history(self, model_version, data_path, feature_names, rows, **explain_kwargs):
+        """Compute contributions for the last `rows` dataset rows in a background thread
+
+        Recomputed when the model version or the dataset file changes (e.g.
+        update_data.py appended new days), and after a failure once
+        HISTORY_RETRY_SECONDS have passed.
+        """
+        key = (model_version, data_path, os.path.getmtime(data_path))
+        with self._lock:
+            history = self.history
+            if history is not None and history['key'] == key:
+                if history['status'] != 'failed' or time.monotonic() - history['failed_at'] < HISTORY_RETRY_SECONDS:
+                    return history
+            self.history = {'key': key, 'model_version': model_version, 'status': 'computing'}
+            history = self.history
+        threading.Thread(target=self._compute_history, name='explain-history', daemon=True,
+                         args=(history, data_path, feature_names, rows, explain_kwargs)).start()
+        return history
+
+    def _compute_history(self, history, data_path, feature_names, rows, explain_kwargs):
+        try:
+            start = time.time()
+            df = pd.read_parquet(data_path) if data_path.endswith('.parquet') else pd.read_csv(data_path)
+            df = df.tail(rows).ffill().bfill().fillna(0)
+            dates = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d').tolist()
+            X = df.reindex(columns=feature_names, fill_value=0).to_numpy(dtype=np.float64)
+
+            contributions = np.empty(X.shape, dtype=np.float32)
+            base_values = np.empty(len(X), dtype=np.float32)
+            outputs = np.empty(len(X), dtype=np.float32)
+            for i in range(0, len(X), HISTORY_BATCH_ROWS):
+                batch = slice(i, i + HISTORY_BATCH_ROWS)
+                contributions[batch], base_values[batch], outputs[batch], method = explain_matrix(
+                    X[batch], **explain_kwargs)
+
+            history.update({
+                'status': 'ready',
+                'method': method,
+                'dates': dates,
+                'index': {d: i for i, d in enumerate(dates)},
+                'values': X.astype(np.float32),
+                'contributions': contributions,
+                'base_values': base_values,
+                'outputs': outputs,
+                'seconds': round(time.time() - start, 2),
+            })
+            print(f"✅ Explanation history ready: {len(dates)} days in {history['seconds']}s")
+        except Exception as e:
+            history.update({'status': 'failed', 'error': str(e), 'failed_at': time.monotonic()})
+            print(f"❌ Explanation history failed: {e}")
+
+    def history_entry(self, history, date, feature_names, top=None):
+        """Explanation for one date from a history dict the caller has checked is ready"""
+        i = history['index'].get(date)
+        if i is None:
+            return None
+        entry = format_explanation(feature_names, history['values'][i], history['contributions'][i].astype(np.float64),
+                                   history['base_values'][i], history['outputs'][i], history['method'], top)
+        entry['as_of'] = date
+        return entry
+
+    def stats(self):
+        history = self.history or {}
+        return {
+            'cache_entries': len(self._cache),
+            'cache_hits': self.hits,
+            'cache_misses': self.misses,
+            'history_status': history.get('status', 'not_started'),
+            'history_days': len(history.get('dates', [])),
+            'history_range': [history['dates'][0], history['dates'][-1]] if history.get('dates') else None,
+        }
@@ -0,0 +1,405 @@
+"""
+Inference Server
+One long-lived process owns the model; web workers send feature rows over a
+Unix socket with the numbers passed through shared memory
+
+Run alongside gunicorn and point the workers at the same socket:
+    python -m webapp.inference_server --socket /tmp/goldsense-inference.sock
+    INFERENCE_SOCKET=/tmp/goldsense-inference.sock gunicorn app:app ...
+
+Protocol (per worker thread):
+    client -> {"op": "attach", "shm": name, "capacity": C, "n_features": F}\\n
+    server -> {"ok": true, "model_version": ...}\\n
+    then repeatedly: client writes rows into shm and sends 4-byte row count,
+    server batches rows from all clients, writes prices back into shm and
+    replies with a 4-byte status (0 = ok).
+A {"op": "status"} line instead of "attach" returns server stats and closes.
+A {"op": "subscribe", "last_event_id": N} line turns the connection into a
+feed of live-stream updates, one JSON line per event ({} as a keepalive): the
+server runs the only stream producer and every web worker relays it.
+"""
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+DEFAULT_SOCKET = '/tmp/goldsense-inference.sock'
+FRAME = struct.Struct('!i')
+DTYPE = np.float64
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+
+class InferenceUnavailable(Exception):
+    """The inference server could not be reached or failed the request"""
+
+
+def _recv_exact(sock, n):
+    data = bytearray()
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise ConnectionError('inference socket closed')
+        data.extend(chunk)
+    return bytes(data)
+
+
+def _recv_line(sock):
+    data = bytearray()
+    while not data.endswith(b'\n'):
+        chunk = sock.recv(1)
+        if not chunk:
+            raise ConnectionError('inference socket closed')
+        data.extend(chunk)
+    return json.loads(data)
+
+
+def _send_line(sock, payload):
+    sock.sendall(json.dumps(payload).encode() + b'\n')
+
+
+def _attach_shared_memory(name):
+    """Attach to a client-owned segment without letting this process unlink it"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    # Python < 3.13 registers attached segments with the resource tracker,
+    # which would unlink them (and warn) when the server exits
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def _segment_views(shm, capacity, n_features):
+    """(inputs, outputs) arrays laid out back to back in one segment"""
+    inputs = np.ndarray((capacity, n_features), dtype=DTYPE, buffer=shm.buf)
+    outputs = np.ndarray((capacity,), dtype=DTYPE, buffer=shm.buf,
+                         offset=capacity * n_features * DTYPE().itemsize)
+    return inputs, outputs
+
+
+# ============================================================
+# Server
+# ============================================================
+
+class _Job:
+    __slots__ = ('inputs', 'outputs', 'status', 'done')
+
+    def __init__(self, inputs, outputs):
+        self.inputs = inputs
+        self.outputs = outputs
+        self.status = STATUS_ERROR
+        self.done = threading.Event()
+
+
+class InferenceServer:
+    """Owns the model and batches prediction requests from all web workers"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, batch_window=0.002, max_batch=256, max_relays=64):
+        self.socket_path = socket_path
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.jobs = queue.Queue()
+        self.clients = 0
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+        self._lock = threading.Lock()
+
+        # This process serves the model itself, so turn off remote mode in the
+        # web module and reuse its loading, hot-reload and prediction code
+        from webapp import app as webapp_app
+        from webapp.stream import StreamFull
+        webapp_app.inference_client = None
+        self.app = webapp_app
+        self.StreamFull = StreamFull
+        # The one producer for /api/stream; web workers subscribe as relays
+        self.updates = webapp_app.stream_producer(max_clients=max_relays)
+
+    def status(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'model_version': self.app.model_version,
+                'n_features': len(self.app.feature_names or []),
+                'clients': self.clients,
+                'batches': self.batches,
+                'rows': self.rows,
+                'avg_batch_rows': round(self.rows / self.batches, 2) if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'stream': self.updates.stats(),
+                # Stream predictions are made here, so their drift is observed here
+                'drift': self.app.drift_monitor.stats(top=5),
+            }
+
+    def serve_forever(self):
+        if not self.app.load_models():
+            raise RuntimeError('Could not load models')
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        listener.listen(128)
+
+        threading.Thread(target=self._batch_loop, name='batcher', daemon=True).start()
+        print(f"🧠 Inference server listening on {self.socket_path} (model {self.app.model_version})")
+        try:
+            while True:
+                conn, _ = listener.accept()
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+            os.unlink(self.socket_path)
+
+    def _handle(self, conn):
+        shm = inputs = outputs = None
+        try:
+            hello = _recv_line(conn)
+            if hello.get('op') == 'status':
+                _send_line(conn, self.status())
+                return
+            if hello.get('op') == 'subscribe':
+                self._stream(conn, hello.get('last_event_id'))
+                return
+            if hello.get('op') != 'attach':
+                _send_line(conn, {'ok': False, 'error': f"unknown op {hello.get('op')}"})
+                return
+
+            capacity, n_features = int(hello['capacity']), int(hello['n_features'])
+            if n_features != len(self.app.feature_names):
+                _send_line(conn, {'ok': False, 'error': f'expected {len(self.app.feature_names)} features'})
+                return
+            shm = _attach_shared_memory(hello['shm'])
+            inputs, outputs = _segment_views(shm, capacity, n_features)
+            _send_line(conn, {'ok': True, 'model_version': self.app.model_version})
+            with self._lock:
+                self.clients += 1
+
+            while True:
+                (rows,) = FRAME.unpack(_recv_exact(conn, FRAME.size))
+                if not 0 < rows <= capacity:
+                    conn.sendall(FRAME.pack(STATUS_ERROR))
+                    continue
+                job = _Job(inputs[:rows], outputs[:rows])
+                self.jobs.put(job)
+                job.done.wait()
+                conn.sendall(FRAME.pack(job.status))
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            if shm is not None:
+                with self._lock:
+                    self.clients -= 1
+                del inputs, outputs  # release buffer exports before closing
+                try:
+                    shm.close()
+                except BufferError:
+                    pass  # the batcher still holds the last job; the mapping is freed with it
+            conn.close()
+
+    def _stream(self, conn, last_event_id):
+        """Send stream updates to one web worker until it disconnects"""
+        try:
+            subscription = self.updates.subscribe(last_event_id)
+        except self.StreamFull:
+            _send_line(conn, {'error': 'too many stream relays'})
+            return
+        try:
+            for item in subscription.events():
+                _send_line(conn, {} if item is None else {'id': item[0], 'event': item[1], 'data': item[2]})
+        finally:
+            subscription.close()
+
+    def _collect(self):
+        """Block for one job, then gather more for up to batch_window seconds"""
+        jobs = [self.jobs.get()]
+        rows = len(jobs[0].inputs)
+        deadline = time.monotonic() + self.batch_window
+        while rows < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self.jobs.get(timeout=remaining)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            rows += len(job.inputs)
+        return jobs, rows
+
+    def _batch_loop(self):
+        while True:
+            jobs, rows = self._collect()
+            try:
+                # Reloads happen on this thread only, so a batch never sees a half-swapped model
+                self.app.maybe_reload_models()
+                prices = self.app.predict_prices(np.vstack([job.inputs for job in jobs]))
+                start = 0
+                for job in jobs:
+                    job.outputs[:] = prices[start:start + len(job.inputs)]
+                    job.status = STATUS_OK
+                    start += len(job.inputs)
+            except Exception as e:
+                print(f"❌ Batch of {rows} rows failed: {e}")
+            with self._lock:
+                self.batches += 1
+                self.rows += rows
+                self.largest_batch = max(self.largest_batch, rows)
+            for job in jobs:
+                job.done.set()
+
+
+# ============================================================
+# Client (used by web workers)
+# ============================================================
+
+def _release_channel(sock, shm):
+    sock.close()
+    shm.close()
+    shm.unlink()
+
+
+class _Channel:
+    """One socket + shared-memory segment; used by one request at a time"""
+
+    def __init__(self, socket_path, n_features, capacity, timeout):
+        self.pid = os.getpid()
+        self.n_features = n_features
+        self.capacity = capacity
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.shm = shared_memory.SharedMemory(create=True, size=capacity * (n_features + 1) * DTYPE().itemsize)
+        # Unlink the segment even if the owning thread exits without closing
+        self._finalizer = weakref.finalize(self, _release_channel, self.sock, self.shm)
+        try:
+            self.sock.settimeout(timeout)
+            self.sock.connect(socket_path)
+            _send_line(self.sock, {'op': 'attach', 'shm': self.shm.name,
+                                   'capacity': capacity, 'n_features': n_features})
+            reply = _recv_line(self.sock)
+            if not reply.get('ok'):
+                raise InferenceUnavailable(reply.get('error', 'attach refused'))
+        except Exception:
+            self.close()
+            raise
+
+    def request(self, X):
+        inputs, outputs = _segment_views(self.shm, self.capacity, self.n_features)
+        try:
+            inputs[:len(X)] = X
+            self.sock.sendall(FRAME.pack(len(X)))
+            (status,) = FRAME.unpack(_recv_exact(self.sock, FRAME.size))
+            if status != STATUS_OK:
+                raise InferenceUnavailable('inference server failed the request')
+            return outputs[:len(X)].copy()
+        finally:
+            del inputs, outputs
+
+    def close(self):
+        self._finalizer()
+
+
+class InferenceClient:
+    """Thread- and greenlet-safe client over a pool of idle channels
+
+    A pool rather than one channel per thread: under gevent every request is a
+    new greenlet, and per-greenlet channels would open a socket and a segment
+    per request. The pool only grows to the peak number of concurrent requests.
+    """
+
+    def __init__(self, socket_path, timeout=10.0, capacity=64, stream_timeout=45.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.capacity = capacity
+        self.stream_timeout = stream_timeout
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _acquire(self, n_features):
+        with self._lock:
+            while self._idle:
+                channel = self._idle.pop()
+                if channel.pid == os.getpid() and channel.n_features == n_features:
+                    return channel
+                # Channels are not inherited across fork (gunicorn --preload)
+                if channel.pid == os.getpid():
+                    channel.close()
+        return _Channel(self.socket_path, n_features, self.capacity, self.timeout)
+
+    def _release(self, channel):
+        with self._lock:
+            self._idle.append(channel)
+
+    def predict(self, X):
+        """Prices in dollars for an unscaled (n, n_features) matrix"""
+        X = np.asarray(X, dtype=DTYPE)
+        if len(X) > self.capacity:
+            return np.concatenate([self.predict(X[i:i + self.capacity])
+                                   for i in range(0, len(X), self.capacity)])
+        channel = None
+        try:
+            channel = self._acquire(X.shape[1])
+            prices = channel.request(X)
+        except (OSError, ConnectionError, ValueError) as e:
+            if channel is not None:
+                channel.close()
+            raise InferenceUnavailable(str(e)) from e
+        except InferenceUnavailable:
+            if channel is not None:
+                self._release(channel)  # the server failed the batch; the channel is still usable
+            raise
+        self._release(channel)
+        return prices
+
+    def updates(self, last_event_id=None):
+        """Yield the server's stream updates as (seq, event, data), None for keepalives"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            # The server sends a keepalive every heartbeat; silence means it is gone
+            sock.settimeout(self.stream_timeout)
+            sock.connect(self.socket_path)
+            _send_line(sock, {'op': 'subscribe', 'last_event_id': last_event_id})
+            with sock.makefile('rb') as lines:
+                for line in lines:
+                    message = json.loads(line)
+                    if 'error' in message:
+                        raise InferenceUnavailable(message['error'])
+                    yield (message['id'], message['event'], message['data']) if message else None
+
+    def status(self, timeout=1.0):
+        """Server stats, or None if it is not reachable"""
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout)
+                sock.connect(self.socket_path)
+                _send_line(sock, {'op': 'status'})
+                return _recv_line(sock)
+        except (OSError, ConnectionError, ValueError):
+            return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GoldSense inference server')
+    parser.add_argument('--socket', default=os.environ.get('INFERENCE_SOCKET', DEFAULT_SOCKET))
+    parser.add_argument('--batch-window-ms', type=float, default=2.0,
+                        help='How long to wait for more requests before running a batch')
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--max-relays', type=int, default=64,
+                        help='Web worker processes that may relay the live stream')
+    args = parser.parse_args()
+
+    # Exit through serve_forever's cleanup (removes the socket file) on SIGTERM
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    InferenceServer(args.socket, args.batch_window_ms / 1000, args.max_batch, args.max_relays).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
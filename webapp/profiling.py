@@ -0,0 +1,204 @@
+"""
+On-Demand Profiling
+Guarded endpoints to sample a running worker's stacks and diff tracemalloc snapshots
+
+Disabled unless PROFILING_TOKEN is set; requests must send the token in the
+X-Profiling-Token header (never a query parameter, which would end up in
+access logs). Nothing runs between requests: the CPU
+sampler only exists for the duration of a /cpu call and tracemalloc is only
+tracing between /memory/start and /memory/stop.
+
+The sampler reads other threads' stacks; each request profiles the worker
+process that serves it. Under gevent workers only native threads are seen:
+the offloaded views on the gevent thread pool, not the greenlets.
+"""
+import hmac
+import math
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from flask import Blueprint, Response, abort, jsonify, request
+
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+MAX_SAMPLE_SECONDS = 60  # well inside gunicorn's --timeout 120
+
+# Leaf frames of threads that are parked waiting for work
+IDLE_LEAVES = {
+    ('threading.py', 'wait'),
+    ('selectors.py', 'select'),
+    ('queue.py', 'get'),
+    ('socket.py', 'accept'),
+}
+
+profiling = Blueprint('profiling', __name__, url_prefix='/debug/profile')
+
+_sampling = threading.Lock()
+_memory_baseline = None
+
+
+@profiling.before_request
+def require_token():
+    """404 unless PROFILING_TOKEN is set, 403 unless the header matches (also guards /api/drift/reset)"""
+    if not PROFILING_TOKEN:
+        abort(404)
+    token = request.headers.get('X-Profiling-Token', '')
+    if not hmac.compare_digest(token, PROFILING_TOKEN):
+        abort(403)
+
+
+class BadArgument(ValueError):
+    """A query parameter failed validation"""
+
+
+@profiling.errorhandler(BadArgument)
+def bad_argument(e):
+    return jsonify({'success': False, 'error': str(e)}), 400
+
+
+def number_arg(name, default, cast=float, minimum=None):
+    """Parse a numeric query parameter; raises BadArgument (400) on invalid input"""
+    raw = request.args.get(name)
+    if raw is None:
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        raise BadArgument(f"'{name}' must be a number, got {raw!r}")
+    if not math.isfinite(value) or (minimum is not None and value < minimum):
+        raise BadArgument(f"'{name}' must be a finite number >= {minimum}, got {raw!r}")
+    return value
+
+
+# ============================================================
+# CPU sampling
+# ============================================================
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def sample_stacks(seconds, interval=0.005, include_idle=False):
+    """Sample every other thread's stack; returns Counter of collapsed stacks"""
+    own_id = threading.get_ident()
+    stacks = Counter()
+    samples = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+            if not include_idle and leaf in IDLE_LEAVES:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, str(thread_id)))
+            stacks[';'.join(reversed(labels))] += 1
+        samples += 1
+        time.sleep(interval)
+    return stacks, samples
+
+
+@profiling.route('/cpu')
+def cpu_profile():
+    """Sample this worker for ?seconds=N; collapsed stacks (flamegraph.pl / speedscope) or ?format=json"""
+    seconds = min(number_arg('seconds', 10, minimum=0), MAX_SAMPLE_SECONDS)
+    interval = max(number_arg('interval_ms', 5, minimum=0), 1) / 1000
+    include_idle = request.args.get('idle', '0') == '1'
+
+    if not _sampling.acquire(blocking=False):
+        return jsonify({'success': False, 'error': 'A profile is already running in this worker'}), 409
+    try:
+        print(f"🔬 Sampling worker {os.getpid()} for {seconds:g}s...")
+        stacks, samples = sample_stacks(seconds, interval, include_idle)
+    finally:
+        _sampling.release()
+
+    if request.args.get('format') == 'json':
+        # Self time per frame: the leaf of each stack
+        leaves = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return jsonify({
+            'pid': os.getpid(),
+            'seconds': seconds,
+            'samples': samples,
+            'top_stacks': [{'stack': s, 'count': c} for s, c in stacks.most_common(20)],
+            'top_self': [{'frame': f, 'count': c} for f, c in leaves.most_common(20)],
+        })
+
+    body = '\n'.join(f"{stack} {count}" for stack, count in stacks.most_common()) + '\n'
+    filename = f"profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed"
+    return Response(body, mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+
+# ============================================================
+# Memory (tracemalloc)
+# ============================================================
+
+def _take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ])
+
+
+@profiling.route('/memory/start', methods=['POST'])
+def memory_start():
+    """Start tracing allocations and record the baseline snapshot"""
+    global _memory_baseline
+    frames = number_arg('frames', 1, cast=int, minimum=1)
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    _memory_baseline = _take_snapshot()
+    print(f"🔬 tracemalloc started in worker {os.getpid()} ({frames} frames)")
+    return jsonify({'success': True, 'pid': os.getpid(), 'frames': tracemalloc.get_traceback_limit()})
+
+
+@profiling.route('/memory/snapshot')
+def memory_snapshot():
+    """Top allocation sites grown since the baseline (?mark=1 moves the baseline here)"""
+    global _memory_baseline
+    if not tracemalloc.is_tracing() or _memory_baseline is None:
+        return jsonify({'success': False, 'error': 'tracemalloc is not running; POST /memory/start first'}), 400
+
+    limit = number_arg('limit', 20, cast=int, minimum=1)
+    group_by = 'traceback' if request.args.get('group_by') == 'traceback' else 'lineno'
+    snapshot = _take_snapshot()
+    diff = snapshot.compare_to(_memory_baseline, group_by)
+    current, peak = tracemalloc.get_traced_memory()
+    if request.args.get('mark') == '1':
+        _memory_baseline = snapshot
+
+    return jsonify({
+        'success': True,
+        'pid': os.getpid(),
+        'traced_mb': round(current / 1e6, 3),
+        'peak_mb': round(peak / 1e6, 3),
+        'top': [{
+            'site': str(stat.traceback) if group_by == 'lineno' else stat.traceback.format(),
+            'size_diff_kb': round(stat.size_diff / 1024, 2),
+            'size_kb': round(stat.size / 1024, 2),
+            'count_diff': stat.count_diff,
+        } for stat in diff[:limit]],
+    })
+
+
+@profiling.route('/memory/stop', methods=['POST'])
+def memory_stop():
+    """Stop tracing and drop the stored snapshot"""
+    global _memory_baseline
+    _memory_baseline = None
+    tracemalloc.stop()
+    print(f"🔬 tracemalloc stopped in worker {os.getpid()}")
+    return jsonify({'success': True, 'pid': os.getpid()})
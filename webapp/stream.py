@@ -0,0 +1,214 @@
+"""
+Live Update Stream
+Server-sent events: one producer fans updates out to every client of every worker
+
+The producer refreshes market data every `interval` seconds and only
+recomputes the prediction when the model inputs or the model version changed,
+so N connected viewers cost one computation. Updates go into a shared ring
+buffer; each client only keeps a cursor into it, and a client that falls
+further behind than the ring skips ahead to the latest update, so per-client
+backlog is bounded.
+
+A broadcaster either produces updates itself (fetch_fn/compute_fn) or relays
+them from a feed: in split mode the inference server runs the only producer
+and every gunicorn worker relays its events, keeping the hub's event ids so
+Last-Event-ID resumes on whichever worker a client reconnects to.
+
+Run the web workers with gevent (`-k gevent`, see the Procfile): clients and
+the relay are then greenlets, and the Condition and time.sleep used here are
+monkey-patched to yield, so an idle stream costs no OS thread.
+"""
+import json
+import threading
+import time
+from collections import deque
+
+
+class StreamFull(Exception):
+    """The per-process subscriber cap has been reached"""
+
+
+def format_event(seq, event, data):
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class UpdateBroadcaster:
+    """Shared ring buffer of updates with per-client cursors"""
+
+    def __init__(self, fetch_fn=None, compute_fn=None, version_fn=None, interval=60, buffer_size=16,
+                 max_clients=4, heartbeat=15, feed=None, retry=5):
+        # feed(last_event_id) yields (seq, event, data) tuples, or None as a keepalive
+        self.fetch_fn = fetch_fn
+        self.compute_fn = compute_fn
+        self.version_fn = version_fn
+        self.feed = feed
+        self.interval = interval
+        self.max_clients = max_clients
+        self.heartbeat = heartbeat
+        self.retry = retry
+        self._events = deque(maxlen=buffer_size)  # (seq, event, data)
+        self._seq = 0
+        self._evicted = 0  # id of the newest update pushed out of the ring
+        self._cond = threading.Condition()
+        self._producer = None
+        self._signature = None
+        self.clients = 0
+        self.refreshes = 0
+        self.recomputes = 0
+        self.relayed = 0
+        self.relay_errors = 0
+        self.skipped_events = 0
+
+    # ---------------- producer ----------------
+
+    def publish(self, event, data, seq=None):
+        with self._cond:
+            # Relayed events keep the hub's ids; a restarted hub starts again from 1
+            if seq is not None and seq <= self._seq:
+                self._events.clear()
+                self._evicted = 0
+            elif len(self._events) == self._events.maxlen:
+                self._evicted = self._events[0][0]
+            self._seq = self._seq + 1 if seq is None else seq
+            self._events.append((self._seq, event, data))
+            self._cond.notify_all()
+
+    def refresh(self):
+        """Fetch inputs; recompute and publish only if they changed"""
+        self.refreshes += 1
+        features = self.fetch_fn()
+        if features is None:
+            print("⚠️  Stream refresh: market data unavailable")
+            return False
+        inputs = tuple(sorted((k, v) for k, v in features.items() if not k.startswith('_')))
+        signature = (self.version_fn(), hash(inputs))
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        self.recomputes += 1
+        self.publish('update', self.compute_fn(features))
+        return True
+
+    def _wait_for_clients(self):
+        with self._cond:
+            # Sleep while nobody is listening
+            while self.clients == 0:
+                self._cond.wait()
+
+    def _run(self):
+        while True:
+            self._wait_for_clients()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"❌ Stream refresh failed: {e}")
+            time.sleep(self.interval)
+
+    def _relay(self):
+        while True:
+            self._wait_for_clients()
+            events = self.feed(self._seq or None)
+            try:
+                for item in events:
+                    if item is not None:
+                        self.publish(*item[1:], seq=item[0])
+                        self.relayed += 1
+                    if self.clients == 0:
+                        break  # drop the feed until someone subscribes again
+                else:
+                    time.sleep(self.retry)  # the hub closed the feed
+            except Exception as e:
+                self.relay_errors += 1
+                print(f"⚠️  Stream relay lost its feed: {e}")
+                time.sleep(self.retry)
+            finally:
+                close = getattr(events, 'close', None)
+                if close is not None:
+                    close()
+
+    def _ensure_producer(self):
+        # Started lazily so each forked gunicorn worker gets its own thread
+        if self._producer is None or not self._producer.is_alive():
+            target, name = (self._relay, 'stream-relay') if self.feed else (self._run, 'stream-producer')
+            self._producer = threading.Thread(target=target, name=name, daemon=True)
+            self._producer.start()
+
+    # ---------------- subscribers ----------------
+
+    def subscribe(self, last_event_id=None):
+        """Register a client and return its iterable of SSE messages (raises StreamFull)"""
+        with self._cond:
+            if self.clients >= self.max_clients:
+                raise StreamFull()
+            self.clients += 1
+            self._ensure_producer()
+            self._cond.notify_all()
+            if last_event_id is not None and any(seq == last_event_id for seq, _, _ in self._events):
+                cursor = last_event_id  # resume after a reconnect
+            else:
+                cursor = self._seq - 1 if self._events else self._seq  # start from the latest update
+        return _Subscription(self, cursor)
+
+    def _release(self):
+        with self._cond:
+            self.clients -= 1
+
+    def stats(self):
+        with self._cond:
+            stats = {
+                'source': 'relay' if self.feed else 'producer',
+                'clients': self.clients,
+                'max_clients': self.max_clients,
+                'last_event_id': self._seq,
+                'buffered_events': len(self._events),
+                'skipped_events': self.skipped_events,
+            }
+        if self.feed:
+            stats.update({'relayed': self.relayed, 'relay_errors': self.relay_errors})
+        else:
+            stats.update({'interval': self.interval, 'refreshes': self.refreshes, 'recomputes': self.recomputes})
+        return stats
+
+
+class _Subscription:
+    """One client's view of the ring; the WSGI server calls close() on disconnect"""
+
+    def __init__(self, broadcaster, cursor):
+        self.broadcaster = broadcaster
+        self.cursor = cursor
+        self._closed = False
+
+    def events(self):
+        """Yield (seq, event, data) as updates arrive, None after each idle heartbeat"""
+        b = self.broadcaster
+        while True:
+            with b._cond:
+                if b._seq <= self.cursor:
+                    b._cond.wait(b.heartbeat)
+                if b._seq < self.cursor:
+                    self.cursor = b._seq - 1  # the hub restarted and its ids began again at 1
+                pending = [e for e in b._events if e[0] > self.cursor]
+                # Relayed ids can have gaps, so compare with what the ring dropped
+                behind = b._evicted > self.cursor
+            if not pending:
+                yield None
+                continue
+            if behind:
+                # Fell behind the ring: drop the backlog, send only the latest
+                b.skipped_events += len(pending) - 1
+                pending = pending[-1:]
+            for item in pending:
+                self.cursor = item[0]
+                yield item
+
+    def __iter__(self):
+        yield f"retry: {self.broadcaster.heartbeat * 1000}\n\n"
+        for item in self.events():
+            yield ": keepalive\n\n" if item is None else format_event(*item)
+
+    def close(self):
+        # Also runs when the response is closed before iteration starts,
+        # where a generator's finally block would not
+        if not self._closed:
+            self._closed = True
+            self.broadcaster._release()